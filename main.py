@@ -1,18 +1,25 @@
 from __future__ import annotations
 
+import argparse
+import asyncio
 import json
 import logging
+import re
 from pathlib import Path
 
-from tqdm.auto import tqdm
+from tqdm.asyncio import tqdm as async_tqdm
+
+try:  # faster JSON encoder for the stats artefacts; stdlib remains the fallback
+    import orjson
+except ImportError:
+    orjson = None
 
 from src.deepseek_module import (
-    classify_context,
-    detect_sentiment,
+    analyze_all_async,
     interpret_table,
     request_commentary,
-    summarize_context,
-    translate_to_russian,
+    translate_all_async,
+    translate_to_russian_async,
 )
 from src.extract_contexts import extract_ethnic_contexts
 from src.linguistic_analysis import analyze_contexts
@@ -28,10 +35,12 @@ logging.basicConfig(
 )
 LOGGER = logging.getLogger("kalmyk-analysis")
 
+CONTEXTS_FULL_PATH = Path("output") / "contexts_full.parquet"
+
 
 def clean_contexts(df):
     df["context"] = df["context"].str.replace(r"\s+", " ", regex=True).str.strip()
-    df["word_count"] = df["context"].apply(lambda x: len(x.split()))
+    df["word_count"] = df["context"].str.count(r"\S+")
     filtered = df[df["word_count"] >= 20].copy()
     print(
         f"🧹 Filtered contexts: {len(filtered)} of {len(df)} "
@@ -40,14 +49,23 @@ def clean_contexts(df):
     return filtered
 
 
+_LABEL_RE = re.compile(
+    r"(ethnographic|functional|evaluative|religious|imperial)", re.IGNORECASE
+)
+
+
 def normalize_label(text: str) -> str:
     if not isinstance(text, str):
         return "unknown"
-    text_lower = text.lower()
-    for cat in ["ethnographic", "functional", "evaluative", "religious", "imperial"]:
-        if cat in text_lower:
-            return cat
-    return "other"
+    match = _LABEL_RE.search(text)
+    return match.group(1).lower() if match else "other"
+
+
+def normalize_label_column(labels):
+    """Vectorized equivalent of `normalize_label` for a whole Series."""
+    values = labels.astype("string")
+    normalized = values.str.extract(_LABEL_RE, expand=False).str.lower().fillna("other")
+    return normalized.where(values.notna(), "unknown")
 
 
 def normalize_attitude(text: str) -> str:
@@ -56,9 +74,71 @@ def normalize_attitude(text: str) -> str:
     return text.strip().split()[0].lower()
 
 
-def main() -> None:
-    tqdm.pandas()
+ANNOTATION_COLUMNS = [
+    "semantic_label",
+    "attitude",
+    "summary_en",
+    "summary_ru",
+    "attitude_ru",
+    "semantic_label_ru",
+]
+
+
+async def _annotate_text(text: str) -> tuple[str, dict[str, str]]:
+    """Run the DeepSeek analysis for one context and translate its summary."""
+    analysis = await analyze_all_async(text)
+    summary_ru = await translate_to_russian_async(analysis["summary_en"])
+    return text, {
+        "semantic_label": analysis["semantic_label"],
+        "attitude": analysis["attitude"],
+        "summary_en": analysis["summary_en"],
+        "summary_ru": summary_ru,
+    }
+
+
+async def _annotate_unique(texts: list[str]) -> dict[str, dict[str, str]]:
+    tasks = [_annotate_text(text) for text in texts]
+    # mininterval coalesces redraws; per-task updates are pure tty overhead.
+    results = await async_tqdm.gather(
+        *tasks, desc="DeepSeek annotation", mininterval=0.5
+    )
+    annotations = dict(results)
 
+    # Словарь меток крошечный (≤5 категорий, ≤4 тональности): переводим
+    # только уникальные значения, причём одним батчевым запросом.
+    unique_terms = sorted(
+        {entry["semantic_label"] for entry in annotations.values()}
+        | {entry["attitude"] for entry in annotations.values()}
+    )
+    term_map = await translate_all_async({term: term for term in unique_terms})
+    for entry in annotations.values():
+        entry["semantic_label_ru"] = term_map[entry["semantic_label"]]
+        entry["attitude_ru"] = term_map[entry["attitude"]]
+    return annotations
+
+
+def annotate_with_deepseek(contexts):
+    """Annotate contexts concurrently; concurrency is capped by the module semaphore.
+
+    Only unique context strings are sent to the API; repeated contexts are
+    filled in by mapping the deduplicated results back onto the frame.
+    """
+    unique_texts = contexts["context"].drop_duplicates().tolist()
+    if len(unique_texts) < len(contexts):
+        LOGGER.info(
+            "Annotating %d unique contexts (%d duplicates skipped).",
+            len(unique_texts),
+            len(contexts) - len(unique_texts),
+        )
+    annotations = asyncio.run(_annotate_unique(unique_texts))
+    for column in ANNOTATION_COLUMNS:
+        contexts[column] = contexts["context"].map(
+            lambda text: annotations[text][column]
+        )
+    return contexts
+
+
+def main(also_csv: bool = False, mode: str = "detailed") -> None:
     texts = load_texts(Path("data") / "texts")
     if texts.empty:
         LOGGER.warning("No texts found in data/texts. Exiting.")
@@ -79,25 +159,10 @@ def main() -> None:
         LOGGER.warning("No contexts remain after filtering. Exiting.")
         return
 
-    # DeepSeek-анализ
-    tqdm.pandas(desc="Classifying contexts")
-    contexts["semantic_label"] = contexts["context"].progress_apply(classify_context)
-    tqdm.pandas(desc="Detecting sentiment")
-    contexts["attitude"] = contexts["context"].progress_apply(detect_sentiment)
-    tqdm.pandas(desc="Summarising contexts")
-    contexts["summary_en"] = contexts["context"].progress_apply(summarize_context)
-
-    # Переводы на русский язык
-    tqdm.pandas(desc="Translating summaries (RU)")
-    contexts["summary_ru"] = contexts["summary_en"].progress_apply(translate_to_russian)
-    tqdm.pandas(desc="Translating sentiment labels (RU)")
-    contexts["attitude_ru"] = contexts["attitude"].progress_apply(translate_to_russian)
-    tqdm.pandas(desc="Translating semantic labels (RU)")
-    contexts["semantic_label_ru"] = contexts["semantic_label"].progress_apply(
-        translate_to_russian
-    )
+    # DeepSeek-анализ и переводы на русский язык (асинхронно, с семафором)
+    contexts = annotate_with_deepseek(contexts)
 
-    contexts["semantic_label"] = contexts["semantic_label"].apply(normalize_label)
+    contexts["semantic_label"] = normalize_label_column(contexts["semantic_label"])
     contexts["attitude"] = contexts["attitude"].apply(normalize_attitude)
 
     contexts = analyze_contexts(contexts)
@@ -105,10 +170,22 @@ def main() -> None:
     create_visuals(contexts)
     generate_report(contexts)
 
-    # Persist enriched contexts for downstream checks.
-    output_path = Path("output") / "contexts_full.csv"
-    contexts.to_csv(output_path, index=False)
-    LOGGER.info("Updated enriched contexts at %s", output_path)
+    # Persist enriched contexts for downstream checks. Parquet + zstd keeps
+    # the canonical store compact and avoids re-parsing strings on reload.
+    contexts.to_parquet(
+        CONTEXTS_FULL_PATH, engine="pyarrow", compression="zstd", index=False
+    )
+    LOGGER.info("Updated enriched contexts at %s", CONTEXTS_FULL_PATH)
+    if also_csv:
+        csv_path = CONTEXTS_FULL_PATH.with_suffix(".csv")
+        # chunksize ограничивает пик памяти при сериализации длинных текстовых колонок.
+        contexts.to_csv(csv_path, index=False, chunksize=10_000)
+        LOGGER.info("Also exported enriched contexts as CSV at %s", csv_path)
+
+    if mode == "short":
+        # Короткий прогон: без сводной статистики и итогового комментария.
+        print(f"✅ Saved full bilingual contexts to {CONTEXTS_FULL_PATH}")
+        return
 
     stats = {
         "total_contexts": len(contexts),
@@ -118,8 +195,11 @@ def main() -> None:
     }
     summary_path = Path("output") / "summary.json"
     summary_path.parent.mkdir(parents=True, exist_ok=True)
-    with summary_path.open("w", encoding="utf-8") as f:
-        json.dump(stats, f, ensure_ascii=False, indent=2)
+    if orjson is not None:
+        summary_path.write_bytes(orjson.dumps(stats, option=orjson.OPT_INDENT_2))
+    else:
+        with summary_path.open("w", encoding="utf-8") as f:
+            json.dump(stats, f, ensure_ascii=False, indent=2)
     print("📊 Saved summary to output/summary.json")
 
     summary_txt_path = Path("output") / "summary.txt"
@@ -136,8 +216,28 @@ def main() -> None:
         )
         f.write(commentary)
     print("🧾 Saved detailed summary to output/summary.txt")
-    print("✅ Saved full bilingual contexts to output/contexts_full.csv")
+    print(f"✅ Saved full bilingual contexts to {CONTEXTS_FULL_PATH}")
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Run the Kalmyk image analysis pipeline.")
+    parser.add_argument(
+        "--also-csv",
+        action="store_true",
+        help="Additionally export the enriched contexts as CSV for manual inspection.",
+    )
+    parser.add_argument(
+        "--mode",
+        choices=["short", "detailed"],
+        default="detailed",
+        help=(
+            "'detailed' (default) writes summary.json/summary.txt with the "
+            "DeepSeek commentary; 'short' stops after the core artefacts."
+        ),
+    )
+    return parser.parse_args()
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    args = parse_args()
+    main(also_csv=args.also_csv, mode=args.mode)
\ No newline at end of file
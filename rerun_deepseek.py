@@ -17,19 +17,18 @@ from src.deepseek_module import (
 
 LOGGER = logging.getLogger("rerun-deepseek")
 CONTEXTS_CANDIDATES = [
+    Path("output") / "contexts_full.parquet",
     Path("output") / "contexts_full.csv",
     Path("output") / "contexts.csv",
 ]
 
 
-def _needs_update(value: str | float | None, force: bool) -> bool:
+def _needs_update_mask(series: pd.Series, force: bool) -> pd.Series:
+    """Vectorized boolean mask of cells that still need a DeepSeek value."""
     if force:
-        return True
-    if value is None:
-        return True
-    if isinstance(value, float) and pd.isna(value):
-        return True
-    return str(value).strip().lower() in {"", "unavailable"}
+        return pd.Series(True, index=series.index)
+    values = series.astype("string")
+    return values.isna() | values.str.strip().str.lower().isin(["", "unavailable"])
 
 
 def _resolve_contexts_path() -> Path:
@@ -43,16 +42,22 @@ def _resolve_contexts_path() -> Path:
 
 def _ensure_column(df: pd.DataFrame, column: str, force: bool, default: str = "") -> pd.Series:
     if column in df.columns:
-        return df[column].apply(lambda v: _needs_update(v, force))
+        return _needs_update_mask(df[column], force)
     df[column] = default
     return pd.Series(True, index=df.index)
 
 
-def rerun_deepseek(force: bool = False) -> None:
+def _read_contexts(path: Path) -> pd.DataFrame:
+    if path.suffix == ".parquet":
+        return pd.read_parquet(path, engine="pyarrow")
+    return pd.read_csv(path)
+
+
+def rerun_deepseek(force: bool = False, also_csv: bool = False) -> None:
     contexts_path = _resolve_contexts_path()
-    contexts = pd.read_csv(contexts_path)
+    contexts = _read_contexts(contexts_path)
     if "context" not in contexts.columns:
-        raise ValueError("contexts.csv does not contain a 'context' column.")
+        raise ValueError(f"{contexts_path} does not contain a 'context' column.")
 
     missing_semantic = _ensure_column(contexts, "semantic_label", force)
     missing_attitude = _ensure_column(contexts, "attitude", force)
@@ -76,29 +81,51 @@ def rerun_deepseek(force: bool = False) -> None:
 
     LOGGER.info("Updating DeepSeek annotations for %d/%d contexts.", total, len(contexts))
 
-    for idx in tqdm(to_update[to_update].index, desc="DeepSeek rerun"):
-        text = contexts.at[idx, "context"]
-        if missing_semantic.loc[idx]:
-            contexts.at[idx, "semantic_label"] = classify_context(text)
-        if missing_attitude.loc[idx]:
-            contexts.at[idx, "attitude"] = detect_sentiment(text)
-        if missing_summary.loc[idx]:
-            contexts.at[idx, "summary_en"] = summarize_context(text)
-
-        if missing_semantic_ru.loc[idx] or missing_semantic.loc[idx]:
-            contexts.at[idx, "semantic_label_ru"] = translate_to_russian(
-                contexts.at[idx, "semantic_label"]
+    def fill_column(column: str, mask: pd.Series, func, source_column: str) -> None:
+        """Compute `func` once per unique source value and map results back."""
+        if not mask.any():
+            return
+        source = contexts.loc[mask, source_column]
+        unique_values = source.dropna().unique()
+        mapping = {
+            value: func(value)
+            for value in tqdm(
+                unique_values, desc=f"DeepSeek rerun: {column}", mininterval=0.5
             )
-        if missing_attitude_ru.loc[idx] or missing_attitude.loc[idx]:
-            contexts.at[idx, "attitude_ru"] = translate_to_russian(contexts.at[idx, "attitude"])
-        if missing_summary_ru.loc[idx] or missing_summary.loc[idx]:
-            contexts.at[idx, "summary_ru"] = translate_to_russian(contexts.at[idx, "summary_en"])
-
-    contexts.to_csv(contexts_path, index=False)
-    if contexts_path != CONTEXTS_CANDIDATES[0]:
-        contexts.to_csv(CONTEXTS_CANDIDATES[0], index=False)
+        }
+        contexts.loc[mask, column] = source.map(mapping)
+
+    fill_column("semantic_label", missing_semantic, classify_context, "context")
+    fill_column("attitude", missing_attitude, detect_sentiment, "context")
+    fill_column("summary_en", missing_summary, summarize_context, "context")
+
+    fill_column(
+        "semantic_label_ru",
+        missing_semantic_ru | missing_semantic,
+        translate_to_russian,
+        "semantic_label",
+    )
+    fill_column(
+        "attitude_ru",
+        missing_attitude_ru | missing_attitude,
+        translate_to_russian,
+        "attitude",
+    )
+    fill_column(
+        "summary_ru",
+        missing_summary_ru | missing_summary,
+        translate_to_russian,
+        "summary_en",
+    )
+
+    canonical_path = CONTEXTS_CANDIDATES[0]
+    contexts.to_parquet(canonical_path, engine="pyarrow", compression="zstd", index=False)
+    if also_csv:
+        contexts.to_csv(
+            canonical_path.with_suffix(".csv"), index=False, chunksize=10_000
+        )
     LOGGER.info(
-        "Contexts file updated with refreshed DeepSeek annotations at %s.", contexts_path
+        "Contexts file updated with refreshed DeepSeek annotations at %s.", canonical_path
     )
 
 
@@ -111,6 +138,11 @@ def parse_args() -> argparse.Namespace:
         action="store_true",
         help="Reprocess all contexts regardless of existing values.",
     )
+    parser.add_argument(
+        "--also-csv",
+        action="store_true",
+        help="Additionally export the refreshed contexts as CSV for manual inspection.",
+    )
     parser.add_argument(
         "--log-level",
         default="INFO",
@@ -129,5 +161,5 @@ def configure_logging(level: str) -> None:
 if __name__ == "__main__":
     args = parse_args()
     configure_logging(args.log_level)
-    rerun_deepseek(force=args.force)
+    rerun_deepseek(force=args.force, also_csv=args.also_csv)
 
@@ -6,60 +6,183 @@ deepseek_module.py
 
 from __future__ import annotations
 
+import asyncio
+import functools
 import hashlib
 import json
 import os
+import sqlite3
+import threading
 import time
 from pathlib import Path
 from typing import Optional
 
+import httpx
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+try:  # быстрый JSON-кодек (C/Rust); stdlib остаётся запасным вариантом
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+try:  # некриптографический хеш для ключей кеша; MD5 остаётся запасным
+    import xxhash
+except ImportError:  # pragma: no cover - optional dependency
+    xxhash = None
+
+
+def _json_loads(data: str | bytes) -> object:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _json_dumps(obj: object) -> str:
+    if orjson is not None:
+        return orjson.dumps(obj).decode("utf-8")
+    return json.dumps(obj, ensure_ascii=False)
 
 
 API_BASE = os.getenv("DEEPSEEK_API_BASE", "https://api.deepseek.com")
 API_KEY = os.getenv("DEEPSEEK_API_KEY")
+# Старый JSONL-кеш; используется только для одноразовой миграции в SQLite.
 CACHE_FILE = "output/deepseek_responses.jsonl"
+CACHE_DB = "output/deepseek_cache.sqlite"
+MAX_CONCURRENCY = int(os.getenv("DEEPSEEK_MAX_CONCURRENCY", "16"))
+
+# Ограничитель параллелизма для асинхронных вызовов API.
+_SEMAPHORE = asyncio.Semaphore(MAX_CONCURRENCY)
+_ASYNC_CLIENT: Optional[httpx.AsyncClient] = None
+
+# Общая сессия для синхронных вызовов: тёплое TCP+TLS-соединение вместо
+# нового рукопожатия на каждый запрос. Повторы по кодам оставлены своим
+# циклом в `_call_deepseek`, поэтому Retry здесь только держит пул.
+_SESSION = requests.Session()
+_SESSION.mount(
+    "https://",
+    HTTPAdapter(
+        pool_connections=MAX_CONCURRENCY,
+        pool_maxsize=MAX_CONCURRENCY,
+        max_retries=Retry(
+            total=0,
+            status_forcelist=[429, 502, 503, 504],
+            backoff_factor=0.5,
+            raise_on_status=False,
+        ),
+    ),
+)
+
+
+def _get_async_client() -> httpx.AsyncClient:
+    """Ленивая инициализация общего httpx-клиента (HTTP/2, пул соединений)."""
+    global _ASYNC_CLIENT
+    if _ASYNC_CLIENT is None or _ASYNC_CLIENT.is_closed:
+        _ASYNC_CLIENT = httpx.AsyncClient(
+            http2=True,
+            timeout=40,
+            limits=httpx.Limits(
+                max_connections=MAX_CONCURRENCY,
+                max_keepalive_connections=MAX_CONCURRENCY,
+            ),
+        )
+    return _ASYNC_CLIENT
 
 
 # ---------------- Вспомогательные функции ---------------- #
 
 
-def _ensure_cache_dir() -> None:
-    cache_path = Path(CACHE_FILE)
-    cache_path.parent.mkdir(parents=True, exist_ok=True)
-    if not cache_path.exists():
-        cache_path.touch()
+def _hash_key(task: str, text: str) -> str:
+    payload = (task + text).encode("utf-8")
+    if xxhash is not None:
+        return xxhash.xxh3_128_hexdigest(payload)
+    return hashlib.md5(payload).hexdigest()
 
 
-def _hash_key(task: str, text: str) -> str:
+def _legacy_hash_key(task: str, text: str) -> str:
+    """MD5-ключ старого формата; нужен только для чтения прежних записей."""
     return hashlib.md5((task + text).encode("utf-8")).hexdigest()
 
 
+_CACHE_CONN: Optional[sqlite3.Connection] = None
+
+
+def _migrate_jsonl_cache(conn: sqlite3.Connection) -> None:
+    """Одноразовый перенос старого JSONL-кеша в таблицу SQLite."""
+    legacy_path = Path(CACHE_FILE)
+    if not legacy_path.exists():
+        return
+    if conn.execute("SELECT 1 FROM kv LIMIT 1").fetchone() is not None:
+        return
+    migrated = 0
+    with legacy_path.open("r", encoding="utf-8") as handle:
+        for line in handle:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                payload = _json_loads(line)
+            except ValueError:
+                continue
+            key = payload.get("key")
+            response = payload.get("response")
+            if not key or response is None:
+                continue
+            conn.execute(
+                "INSERT OR REPLACE INTO kv(key, response) VALUES (?, ?)",
+                (key, response),
+            )
+            migrated += 1
+    if migrated:
+        print(f"[DeepSeek cache] Migrated {migrated} entries from {CACHE_FILE}")
+
+
+def _get_cache_conn() -> sqlite3.Connection:
+    global _CACHE_CONN
+    if _CACHE_CONN is None:
+        db_path = Path(CACHE_DB)
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(db_path, isolation_level=None, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS kv(key TEXT PRIMARY KEY, response TEXT NOT NULL)"
+        )
+        _migrate_jsonl_cache(conn)
+        _CACHE_CONN = conn
+    return _CACHE_CONN
+
+
+# Горячий кеш в памяти поверх SQLite: O(1) на каждое попадание без SELECT.
+_CACHE: dict[str, str] = {}
+_CACHE_LOADED = False
+_CACHE_LOCK = threading.Lock()
+
+
+def _load_cache() -> None:
+    global _CACHE_LOADED
+    if _CACHE_LOADED:
+        return
+    with _CACHE_LOCK:
+        if _CACHE_LOADED:
+            return
+        for key, response in _get_cache_conn().execute("SELECT key, response FROM kv"):
+            _CACHE.setdefault(key, response)
+        _CACHE_LOADED = True
+
+
 def _cached_get(key: str) -> Optional[str]:
-    cache_path = Path(CACHE_FILE)
-    if not cache_path.exists():
-        return None
-    try:
-        with cache_path.open("r", encoding="utf-8") as handle:
-            for line in handle:
-                line = line.strip()
-                if not line:
-                    continue
-                try:
-                    payload = json.loads(line)
-                except json.JSONDecodeError:
-                    continue
-                if payload.get("key") == key:
-                    return payload.get("response")
-    except OSError:
-        return None
-    return None
+    _load_cache()
+    return _CACHE.get(key)
 
 
 def _cached_set(key: str, resp: str) -> None:
-    _ensure_cache_dir()
-    with open(CACHE_FILE, "a", encoding="utf-8") as handle:
-        handle.write(json.dumps({"key": key, "response": resp}, ensure_ascii=False) + "\n")
+    _load_cache()
+    _CACHE[key] = resp
+    _get_cache_conn().execute(
+        "INSERT OR REPLACE INTO kv(key, response) VALUES (?, ?)", (key, resp)
+    )
 
 
 def _load_api_key() -> Optional[str]:
@@ -79,28 +202,51 @@ def _load_api_key() -> Optional[str]:
     return None
 
 
-def _call_deepseek(prompt: str, retries: int = 3, delay: int = 3) -> str:
-    """Универсальный вызов DeepSeek Chat API с повтором и обработкой ошибок."""
-    api_key = _load_api_key()
-    if not api_key:
-        return "unavailable"
+SYSTEM_PROMPT = "You are a semantic analyzer for historical English texts."
 
-    url = f"{API_BASE.rstrip('/')}/v1/chat/completions"
-    headers = {"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"}
+
+def _build_payload(
+    prompt: str,
+    response_format: Optional[dict] = None,
+    instruction: Optional[str] = None,
+) -> dict:
+    # Весь неизменный текст задачи уходит в системное сообщение, а в
+    # пользовательском остаётся только текст контекста: байт-в-байт
+    # одинаковый префикс между вызовами попадает в префикс-кеш DeepSeek.
+    system_content = SYSTEM_PROMPT
+    if instruction:
+        system_content = f"{SYSTEM_PROMPT}\n\n{instruction}"
     data = {
         "model": "deepseek-chat",
         "messages": [
-            {
-                "role": "system",
-                "content": "You are a semantic analyzer for historical English texts.",
-            },
+            {"role": "system", "content": system_content},
             {"role": "user", "content": prompt},
         ],
     }
+    if response_format is not None:
+        data["response_format"] = response_format
+    return data
+
+
+def _call_deepseek(
+    prompt: str,
+    retries: int = 3,
+    delay: int = 3,
+    response_format: Optional[dict] = None,
+    instruction: Optional[str] = None,
+) -> str:
+    """Универсальный вызов DeepSeek Chat API с повтором и обработкой ошибок."""
+    api_key = _load_api_key()
+    if not api_key:
+        return "unavailable"
+
+    url = f"{API_BASE.rstrip('/')}/v1/chat/completions"
+    headers = {"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"}
+    data = _build_payload(prompt, response_format, instruction)
 
     for attempt in range(retries):
         try:
-            resp = requests.post(url, headers=headers, json=data, timeout=40)
+            resp = _SESSION.post(url, headers=headers, json=data, timeout=40)
             if resp.status_code == 200:
                 result = (
                     resp.json()
@@ -119,12 +265,86 @@ def _call_deepseek(prompt: str, retries: int = 3, delay: int = 3) -> str:
     return "unavailable"
 
 
-def _cached_request(task: str, text: str, prompt: str) -> str:
-    key = _hash_key(task, text or "")
+async def _call_deepseek_async(
+    prompt: str,
+    retries: int = 3,
+    delay: int = 3,
+    response_format: Optional[dict] = None,
+    instruction: Optional[str] = None,
+) -> str:
+    """Асинхронный вариант `_call_deepseek` с семафором на параллелизм."""
+    api_key = _load_api_key()
+    if not api_key:
+        return "unavailable"
+
+    url = f"{API_BASE.rstrip('/')}/v1/chat/completions"
+    headers = {"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"}
+    data = _build_payload(prompt, response_format, instruction)
+
+    client = _get_async_client()
+    for attempt in range(retries):
+        try:
+            async with _SEMAPHORE:
+                resp = await client.post(url, headers=headers, json=data)
+            if resp.status_code == 200:
+                result = (
+                    resp.json()
+                    .get("choices", [{}])[0]
+                    .get("message", {})
+                    .get("content", "")
+                    .strip()
+                )
+                if result:
+                    return result
+            else:
+                print(f"[DeepSeek {attempt + 1}] HTTP {resp.status_code}")
+        except Exception as exc:  # noqa: BLE001
+            print(f"[DeepSeek exception] {exc}")
+        await asyncio.sleep(delay)
+    return "unavailable"
+
+
+def _cached_lookup(task: str, text: str) -> tuple[str, Optional[str]]:
+    """Resolve the cache key and any stored response, re-keying legacy MD5 hits."""
+    key = _hash_key(task, text)
     cached = _cached_get(key)
+    if cached is None and xxhash is not None:
+        cached = _cached_get(_legacy_hash_key(task, text))
+        if cached is not None:
+            _cached_set(key, cached)
+    return key, cached
+
+
+def _cached_request(
+    task: str,
+    text: str,
+    prompt: str,
+    response_format: Optional[dict] = None,
+    instruction: Optional[str] = None,
+) -> str:
+    key, cached = _cached_lookup(task, text or "")
     if cached is not None:
         return cached
-    result = _call_deepseek(prompt)
+    result = _call_deepseek(
+        prompt, response_format=response_format, instruction=instruction
+    )
+    _cached_set(key, result)
+    return result
+
+
+async def _cached_request_async(
+    task: str,
+    text: str,
+    prompt: str,
+    response_format: Optional[dict] = None,
+    instruction: Optional[str] = None,
+) -> str:
+    key, cached = _cached_lookup(task, text or "")
+    if cached is not None:
+        return cached
+    result = await _call_deepseek_async(
+        prompt, response_format=response_format, instruction=instruction
+    )
     _cached_set(key, result)
     return result
 
@@ -132,37 +352,200 @@ def _cached_request(task: str, text: str, prompt: str) -> str:
 # ---------------- Основные функции ---------------- #
 
 
+# Статические инструкции задач: весь неизменный текст стоит до
+# динамического `Text: {text}`, чтобы префикс запроса оставался
+# байт-идентичным между вызовами.
+CLASSIFY_INSTRUCTION = (
+    "Classify the given text about Kalmyks into one of "
+    "['ethnographic', 'functional', 'evaluative', 'religious', 'imperial']."
+)
+SENTIMENT_INSTRUCTION = (
+    "Determine the overall attitude toward Kalmyks in the given text "
+    "(positive, neutral, negative, or ambivalent)."
+)
+SUMMARY_INSTRUCTION = (
+    "Provide a short, factual summary (1–2 sentences) of the given text about Kalmyks."
+)
+TRANSLATE_INSTRUCTION = (
+    "Translate the given text into Russian, preserving scientific tone."
+)
+
+
+def _user_text(text: str) -> str:
+    return f"Text: {text}"
+
+
+@functools.lru_cache(maxsize=4096)
 def classify_context(text: str) -> str:
-    prompt = (
-        "Classify this text about Kalmyks into one of "
-        "['ethnographic', 'functional', 'evaluative', 'religious', 'imperial'].\n"
-        f"Text: {text}"
+    return _cached_request(
+        "classify", text, _user_text(text), instruction=CLASSIFY_INSTRUCTION
     )
-    return _cached_request("classify", text, prompt)
 
 
+@functools.lru_cache(maxsize=4096)
 def detect_sentiment(text: str) -> str:
-    prompt = (
-        "Determine the overall attitude toward Kalmyks (positive, neutral, negative, or ambivalent).\n"
-        f"Text: {text}"
+    return _cached_request(
+        "sentiment", text, _user_text(text), instruction=SENTIMENT_INSTRUCTION
     )
-    return _cached_request("sentiment", text, prompt)
 
 
+@functools.lru_cache(maxsize=4096)
 def summarize_context(text: str) -> str:
-    prompt = (
-        "Provide a short, factual summary (1–2 sentences) of this text about Kalmyks.\n"
-        f"Text: {text}"
+    return _cached_request(
+        "summary", text, _user_text(text), instruction=SUMMARY_INSTRUCTION
     )
-    return _cached_request("summary", text, prompt)
 
 
+@functools.lru_cache(maxsize=4096)
 def translate_to_russian(text: str) -> str:
     """Перевод любого английского текста на русский (через DeepSeek)."""
     if not text or str(text).strip().lower() in {"unavailable", "none"}:
         return "нет данных"
-    prompt = f"Translate this text into Russian, preserving scientific tone:\n{text}"
-    return _cached_request("translate", text, prompt)
+    return _cached_request(
+        "translate", text, _user_text(text), instruction=TRANSLATE_INSTRUCTION
+    )
+
+
+async def classify_context_async(text: str) -> str:
+    return await _cached_request_async(
+        "classify", text, _user_text(text), instruction=CLASSIFY_INSTRUCTION
+    )
+
+
+async def detect_sentiment_async(text: str) -> str:
+    return await _cached_request_async(
+        "sentiment", text, _user_text(text), instruction=SENTIMENT_INSTRUCTION
+    )
+
+
+async def summarize_context_async(text: str) -> str:
+    return await _cached_request_async(
+        "summary", text, _user_text(text), instruction=SUMMARY_INSTRUCTION
+    )
+
+
+async def translate_to_russian_async(text: str) -> str:
+    """Асинхронный перевод английского текста на русский (через DeepSeek)."""
+    if not text or str(text).strip().lower() in {"unavailable", "none"}:
+        return "нет данных"
+    return await _cached_request_async(
+        "translate", text, _user_text(text), instruction=TRANSLATE_INSTRUCTION
+    )
+
+
+JSON_RESPONSE_FORMAT = {"type": "json_object"}
+
+ANALYZE_ALL_INSTRUCTION = (
+    "Analyze the given text about Kalmyks and respond with a strict JSON object "
+    "containing exactly these keys:\n"
+    "- \"semantic_label\": one of ['ethnographic', 'functional', 'evaluative', "
+    "'religious', 'imperial'];\n"
+    "- \"attitude\": the overall attitude toward Kalmyks (positive, neutral, "
+    "negative, or ambivalent);\n"
+    "- \"summary_en\": a short, factual summary (1–2 sentences)."
+)
+TRANSLATE_ALL_INSTRUCTION = (
+    "Translate the values of the given JSON object into Russian, preserving "
+    "scientific tone. Respond with a strict JSON object with the same keys "
+    "and only the translated values."
+)
+
+
+def _parse_json_response(raw: str, expected_keys: set[str]) -> Optional[dict]:
+    try:
+        payload = _json_loads(raw)
+    except (ValueError, TypeError):
+        return None
+    if not isinstance(payload, dict) or not expected_keys.issubset(payload):
+        return None
+    if not all(isinstance(payload[key], str) for key in expected_keys):
+        return None
+    return {key: payload[key].strip() for key in expected_keys}
+
+
+ANALYZE_KEYS = {"semantic_label", "attitude", "summary_en"}
+
+
+def analyze_all(text: str) -> dict:
+    """
+    Классификация, тональность и резюме одним структурированным запросом.
+
+    При ошибке схемы ответа откатывается на три отдельных вызова.
+    """
+    raw = _cached_request(
+        "analyze-all",
+        text,
+        _user_text(text),
+        JSON_RESPONSE_FORMAT,
+        instruction=ANALYZE_ALL_INSTRUCTION,
+    )
+    parsed = _parse_json_response(raw, ANALYZE_KEYS)
+    if parsed is not None:
+        return parsed
+    return {
+        "semantic_label": classify_context(text),
+        "attitude": detect_sentiment(text),
+        "summary_en": summarize_context(text),
+    }
+
+
+async def analyze_all_async(text: str) -> dict:
+    """Асинхронный вариант `analyze_all`."""
+    raw = await _cached_request_async(
+        "analyze-all",
+        text,
+        _user_text(text),
+        JSON_RESPONSE_FORMAT,
+        instruction=ANALYZE_ALL_INSTRUCTION,
+    )
+    parsed = _parse_json_response(raw, ANALYZE_KEYS)
+    if parsed is not None:
+        return parsed
+    semantic_label, attitude, summary_en = await asyncio.gather(
+        classify_context_async(text),
+        detect_sentiment_async(text),
+        summarize_context_async(text),
+    )
+    return {
+        "semantic_label": semantic_label,
+        "attitude": attitude,
+        "summary_en": summary_en,
+    }
+
+
+def translate_all(labels: dict) -> dict:
+    """Перевод всех значений словаря на русский одним запросом."""
+    cache_text = json.dumps(labels, ensure_ascii=False, sort_keys=True)
+    raw = _cached_request(
+        "translate-all",
+        cache_text,
+        _json_dumps(labels),
+        JSON_RESPONSE_FORMAT,
+        instruction=TRANSLATE_ALL_INSTRUCTION,
+    )
+    parsed = _parse_json_response(raw, set(labels))
+    if parsed is not None:
+        return parsed
+    return {key: translate_to_russian(value) for key, value in labels.items()}
+
+
+async def translate_all_async(labels: dict) -> dict:
+    """Асинхронный вариант `translate_all`."""
+    cache_text = json.dumps(labels, ensure_ascii=False, sort_keys=True)
+    raw = await _cached_request_async(
+        "translate-all",
+        cache_text,
+        _json_dumps(labels),
+        JSON_RESPONSE_FORMAT,
+        instruction=TRANSLATE_ALL_INSTRUCTION,
+    )
+    parsed = _parse_json_response(raw, set(labels))
+    if parsed is not None:
+        return parsed
+    translated = await asyncio.gather(
+        *[translate_to_russian_async(value) for value in labels.values()]
+    )
+    return dict(zip(labels, translated))
 
 
 def interpret_table(title: str, sample: str) -> str:
@@ -196,10 +579,18 @@ def request_commentary(prompt: str, task: str = "commentary") -> str:
 
 
 __all__ = [
+    "analyze_all",
+    "analyze_all_async",
+    "translate_all",
+    "translate_all_async",
     "classify_context",
+    "classify_context_async",
     "detect_sentiment",
+    "detect_sentiment_async",
     "summarize_context",
+    "summarize_context_async",
     "translate_to_russian",
+    "translate_to_russian_async",
     "interpret_table",
     "request_commentary",
     "interpret_cached",
@@ -5,21 +5,78 @@ surrounding contexts for downstream analysis.
 
 from __future__ import annotations
 
+import csv
 import logging
 import re
+from bisect import bisect_right
+from concurrent.futures import ProcessPoolExecutor
+from itertools import accumulate
 from pathlib import Path
-from typing import Iterable, List
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 
 import pandas as pd
 from tqdm import tqdm
 
 from src.utils import hash_text, tokenize_sentences
 
+try:  # Aho–Corasick automaton: one pass regardless of pattern count.
+    import ahocorasick
+except ImportError:  # pragma: no cover - optional dependency
+    ahocorasick = None
+
 
 LOGGER = logging.getLogger(__name__)
 CONTEXT_WINDOW = 3
 CONTEXT_OUTPUT_PATH = Path("output") / "contexts.csv"
 
+CONTEXT_FIELDNAMES = [
+    "context_id",
+    "document_id",
+    "filename",
+    "author",
+    "year",
+    "title",
+    "source",
+    "ethnonym",
+    "ethnonym_normalised",
+    "sentence_index",
+    "occurrence_index",
+    "target_sentence",
+    "context",
+    "pre_context",
+    "post_context",
+    "context_sentence_count",
+]
+
+CONTEXT_INT_COLUMNS = {"sentence_index", "occurrence_index", "context_sentence_count"}
+CONTEXT_STRING_COLUMNS = {
+    name for name in CONTEXT_FIELDNAMES if name not in CONTEXT_INT_COLUMNS | {"year"}
+}
+
+
+def _records_to_frame(records: Iterable[Dict[str, object]]) -> pd.DataFrame:
+    """
+    Build the contexts DataFrame from per-match records via columnar buffers.
+
+    Transposing to struct-of-arrays first and constructing each column with
+    an explicit dtype skips pandas' per-column type inference over every cell
+    and avoids holding both the record dicts and the frame at peak.
+    """
+    columns: Dict[str, List[object]] = {name: [] for name in CONTEXT_FIELDNAMES}
+    for record in records:
+        for name, values in columns.items():
+            values.append(record[name])
+
+    data = {}
+    for name, values in columns.items():
+        if name in CONTEXT_INT_COLUMNS:
+            data[name] = pd.array(values, dtype="int32")
+        elif name == "year":
+            data[name] = pd.array(values, dtype="Int32")
+        else:
+            data[name] = pd.array(values, dtype="string")
+    return pd.DataFrame(data)
+
 
 def _compile_ethnonym_pattern(ethnonyms: Iterable[str]) -> re.Pattern[str]:
     escaped = [re.escape(term) for term in ethnonyms]
@@ -27,11 +84,167 @@ def _compile_ethnonym_pattern(ethnonyms: Iterable[str]) -> re.Pattern[str]:
     return re.compile(rf"\b({group})\b", re.IGNORECASE)
 
 
+def _build_ethnonym_automaton(ethnonyms: Iterable[str]):
+    """Build an Aho–Corasick automaton, or None when the package is missing."""
+    if ahocorasick is None:
+        return None
+    automaton = ahocorasick.Automaton()
+    for term in {term.lower() for term in ethnonyms}:
+        automaton.add_word(term, term)
+    automaton.make_automaton()
+    return automaton
+
+
+def _is_word_boundary(text: str, start: int, end: int) -> bool:
+    """Replicate the regex \\b semantics around a matched span."""
+    if start > 0 and (text[start - 1].isalnum() or text[start - 1] == "_"):
+        return False
+    if end < len(text) and (text[end].isalnum() or text[end] == "_"):
+        return False
+    return True
+
+
+def _find_ethnonym_spans(
+    text: str,
+    pattern: Optional[re.Pattern[str]],
+    automaton,
+) -> List[Tuple[int, int]]:
+    """
+    Locate ethnonym occurrences in `text` as (start, end) character spans.
+
+    Uses the Aho–Corasick automaton when available (single pass independent
+    of the number of ethnonym variants), otherwise the alternation regex.
+    """
+    if automaton is not None:
+        lowered = text.lower()
+        spans = [
+            (end_index - len(term) + 1, end_index + 1)
+            for end_index, term in automaton.iter(lowered)
+            if _is_word_boundary(lowered, end_index - len(term) + 1, end_index + 1)
+        ]
+        spans.sort()
+        return spans
+    return [match.span() for match in pattern.finditer(text)]
+
+
+def _scan_document(
+    doc: Dict[str, object],
+    pattern: Optional[re.Pattern[str]],
+    automaton,
+    window: int,
+) -> List[Dict[str, object]]:
+    """Extract all context records for a single document."""
+    sentences = tokenize_sentences(doc["text"])
+    if not sentences:
+        return []
+    # Scan the document once and map each hit back to its sentence via
+    # bisect over precomputed sentence-start offsets, instead of
+    # re-entering the matcher for every sentence.
+    joined_text = " ".join(sentences)
+    sentence_starts = [0]
+    sentence_starts.extend(accumulate(len(s) + 1 for s in sentences[:-1]))
+
+    records: List[Dict[str, object]] = []
+    occurrence_counter = 0
+    for span_start, span_end in _find_ethnonym_spans(joined_text, pattern, automaton):
+        matched = joined_text[span_start:span_end]
+        sentence_idx = bisect_right(sentence_starts, span_start) - 1
+        sentence = sentences[sentence_idx]
+        occurrence_counter += 1
+        start = max(sentence_idx - window, 0)
+        stop = min(sentence_idx + window + 1, len(sentences))
+        context_sentences = sentences[start:stop]
+        pre_context = " ".join(sentences[start:sentence_idx])
+        post_context = " ".join(sentences[sentence_idx + 1:stop])
+
+        context_text = " ".join(context_sentences)
+        context_hash = hash_text(
+            f"{doc['document_id']}|{sentence_idx}|{matched}|{context_text}"
+        )
+
+        records.append(
+            {
+                "context_id": context_hash,
+                "document_id": doc["document_id"],
+                "filename": doc["filename"],
+                "author": doc["author"],
+                "year": doc["year"],
+                "title": doc["title"],
+                "source": doc["source"],
+                "ethnonym": matched,
+                "ethnonym_normalised": matched.lower(),
+                "sentence_index": sentence_idx,
+                "occurrence_index": occurrence_counter,
+                "target_sentence": sentence,
+                "context": context_text,
+                "pre_context": pre_context,
+                "post_context": post_context,
+                "context_sentence_count": len(context_sentences),
+            }
+        )
+    return records
+
+
+# Состояние воркера: матчер строится один раз на процесс в initializer,
+# чтобы не пересылать автомат в каждом вызове.
+_WORKER_STATE: Dict[str, object] = {}
+
+
+def _init_scan_worker(ethnonyms: List[str], window: int) -> None:
+    automaton = _build_ethnonym_automaton(ethnonyms)
+    pattern = None if automaton is not None else _compile_ethnonym_pattern(ethnonyms)
+    _WORKER_STATE.update(pattern=pattern, automaton=automaton, window=window)
+
+
+def _scan_document_worker(doc: Dict[str, object]) -> List[Dict[str, object]]:
+    return _scan_document(
+        doc,
+        _WORKER_STATE["pattern"],
+        _WORKER_STATE["automaton"],
+        _WORKER_STATE["window"],
+    )
+
+
+def _iter_context_records(
+    texts: pd.DataFrame,
+    ethnonyms: List[str],
+    window: int,
+    max_workers: Optional[int] = None,
+) -> Iterator[Dict[str, object]]:
+    """
+    Yield one context record per ethnonym occurrence across all documents.
+
+    Documents are scanned in parallel with a process pool (one document per
+    task) unless `max_workers=1` or the corpus is a single document.
+    """
+    docs = texts.to_dict(orient="records")
+    use_processes = len(docs) > 1 and (max_workers is None or max_workers > 1)
+
+    if use_processes:
+        with ProcessPoolExecutor(
+            max_workers=max_workers,
+            initializer=_init_scan_worker,
+            initargs=(list(ethnonyms), window),
+        ) as executor:
+            results = executor.map(_scan_document_worker, docs, chunksize=4)
+            for records in tqdm(
+                results, total=len(docs), desc="Extracting ethnonym contexts"
+            ):
+                yield from records
+    else:
+        automaton = _build_ethnonym_automaton(ethnonyms)
+        pattern = None if automaton is not None else _compile_ethnonym_pattern(ethnonyms)
+        for doc in tqdm(docs, total=len(docs), desc="Extracting ethnonym contexts"):
+            yield from _scan_document(doc, pattern, automaton, window)
+
+
 def extract_ethnic_contexts(
     texts: pd.DataFrame,
     ethnonyms: List[str],
     window: int = CONTEXT_WINDOW,
     output_path: Path | str = CONTEXT_OUTPUT_PATH,
+    streaming: bool = True,
+    max_workers: Optional[int] = None,
 ) -> pd.DataFrame:
     """
     Identify occurrences of Kalmyk ethnonyms and extract +/- `window` sentences.
@@ -47,64 +260,37 @@ def extract_ethnic_contexts(
         Number of sentences before and after the target sentence to include.
     output_path:
         Path where the aggregated contexts CSV will be written.
+    streaming:
+        When True (default), records are written to the CSV as they are
+        produced, keeping peak memory independent of corpus size; the
+        returned DataFrame is read back from disk. When False, all records
+        are buffered in memory first (legacy behaviour).
+    max_workers:
+        Size of the process pool used to scan documents in parallel.
+        Defaults to the executor's CPU-count heuristic; pass 1 to force a
+        serial scan in the current process.
     """
     if texts.empty:
         LOGGER.warning("No texts provided for context extraction.")
         return pd.DataFrame()
 
-    pattern = _compile_ethnonym_pattern(ethnonyms)
-    records = []
-
-    progress = tqdm(
-        texts.itertuples(index=False),
-        total=len(texts),
-        desc="Extracting ethnonym contexts",
-    )
-
-    for doc in progress:
-        sentences = tokenize_sentences(doc.text)
-        occurrence_counter = 0
-        for sentence_idx, sentence in enumerate(sentences):
-            matches = list(pattern.finditer(sentence))
-            if not matches:
-                continue
-            for match in matches:
-                occurrence_counter += 1
-                start = max(sentence_idx - window, 0)
-                stop = min(sentence_idx + window + 1, len(sentences))
-                context_sentences = sentences[start:stop]
-                pre_context = " ".join(sentences[start:sentence_idx])
-                post_context = " ".join(sentences[sentence_idx + 1:stop])
-
-                context_text = " ".join(context_sentences)
-                context_hash = hash_text(
-                    f"{doc.document_id}|{sentence_idx}|{match.group(0)}|{context_text}"
-                )
-
-                records.append(
-                    {
-                        "context_id": context_hash,
-                        "document_id": doc.document_id,
-                        "filename": doc.filename,
-                        "author": doc.author,
-                        "year": doc.year,
-                        "title": doc.title,
-                        "source": doc.source,
-                        "ethnonym": match.group(0),
-                        "ethnonym_normalised": match.group(1).lower(),
-                        "sentence_index": sentence_idx,
-                        "occurrence_index": occurrence_counter,
-                        "target_sentence": sentence,
-                        "context": context_text,
-                        "pre_context": pre_context,
-                        "post_context": post_context,
-                        "context_sentence_count": len(context_sentences),
-                    }
-                )
-
-    contexts = pd.DataFrame(records)
     output_path = Path(output_path)
     output_path.parent.mkdir(parents=True, exist_ok=True)
+
+    if streaming:
+        row_count = 0
+        with output_path.open("w", encoding="utf-8", newline="") as handle:
+            writer = csv.DictWriter(handle, fieldnames=CONTEXT_FIELDNAMES)
+            writer.writeheader()
+            for record in _iter_context_records(texts, ethnonyms, window, max_workers):
+                writer.writerow(record)
+                row_count += 1
+        LOGGER.info("Saved %d contexts to %s", row_count, output_path)
+        if row_count == 0:
+            return pd.DataFrame(columns=CONTEXT_FIELDNAMES)
+        return pd.read_csv(output_path)
+
+    contexts = _records_to_frame(_iter_context_records(texts, ethnonyms, window, max_workers))
     contexts.to_csv(output_path, index=False)
     LOGGER.info("Saved %d contexts to %s", len(contexts), output_path)
     return contexts
@@ -5,14 +5,22 @@ lemma extraction, and toponym identification.
 
 from __future__ import annotations
 
+import functools
 import logging
+import os
+import queue
+import threading
 from collections import Counter, defaultdict
 from pathlib import Path
-from typing import Dict, Iterable, List
+from typing import Dict, Iterable, List, Optional
 
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 import spacy
+from spacy.attrs import IS_ALPHA, LEMMA, POS
 from spacy.language import Language
+from spacy.symbols import ADJ, VERB
 from tqdm import tqdm
 
 from src.utils import hash_text, load_stopwords
@@ -20,17 +28,22 @@ from src.utils import hash_text, load_stopwords
 
 LOGGER = logging.getLogger(__name__)
 DEFAULT_STOPWORDS_PATH = Path("data") / "stopwords_en.txt"
-COLLOCATIONS_OUTPUT_PATH = Path("output") / "collocations.csv"
+COLLOCATIONS_OUTPUT_PATH = Path("output") / "collocations.parquet"
 SPACY_MODEL = "en_core_web_sm"
+SPACY_BATCH_SIZE = 64
 
 _NLP: Language | None = None
 
+# analyze_contexts only reads token.pos_, token.lemma_ and GPE entities;
+# the dependency parser and friends are pure overhead here.
+SPACY_DISABLED_PIPES = ["parser", "senter", "textcat"]
+
 
 def _get_nlp() -> Language:
     global _NLP
     if _NLP is None:
         try:
-            _NLP = spacy.load(SPACY_MODEL)
+            _NLP = spacy.load(SPACY_MODEL, disable=SPACY_DISABLED_PIPES)
         except OSError as exc:  # pragma: no cover
             raise RuntimeError(
                 f"spaCy model '{SPACY_MODEL}' is not installed. "
@@ -39,16 +52,20 @@ def _get_nlp() -> Language:
     return _NLP
 
 
-def _normalise_context_id(context_row: pd.Series) -> str:
-    if "context_id" in context_row and isinstance(context_row["context_id"], str):
-        return context_row["context_id"]
-    return hash_text(context_row.get("context", ""))
+@functools.lru_cache(maxsize=4)
+def _load_stopwords_cached(path_str: str) -> frozenset[str]:
+    """Memoized stopword loader; keyed on the resolved path so repeated
+    analyze_contexts calls (and notebook reruns) skip re-reading the file."""
+    return frozenset(load_stopwords(path_str))
 
 
 def analyze_contexts(
     contexts: pd.DataFrame,
     stopwords_path: Path | str = DEFAULT_STOPWORDS_PATH,
     collocations_output: Path | str = COLLOCATIONS_OUTPUT_PATH,
+    batch_size: int = SPACY_BATCH_SIZE,
+    n_process: Optional[int] = None,
+    legacy_csv: bool = False,
 ) -> pd.DataFrame:
     """
     Annotate contexts with linguistic features and export collocation statistics.
@@ -57,106 +74,178 @@ def analyze_contexts(
         - adjectives: ordered list of adjective lemmas and frequencies
         - verbs: ordered list of verb lemmas and frequencies
         - toponyms: list of distinct GPE entities detected by spaCy
+
+    Documents are fed to spaCy through `nlp.pipe`, which batches inference
+    (`batch_size`) and can spread it over worker processes (`n_process`,
+    defaulting to CPU count minus one).
     """
     if contexts.empty:
         LOGGER.warning("Empty contexts dataframe supplied to analyze_contexts.")
         return contexts
 
     nlp = _get_nlp()
-    stopwords = load_stopwords(stopwords_path)
+    stopwords = _load_stopwords_cached(str(Path(stopwords_path).resolve()))
+    if n_process is None:
+        n_process = max(1, (os.cpu_count() or 2) - 1)
+
+    # Коллокации агрегируются сразу в Counter по полному ключу: на выходе
+    # уже просуммированные строки, так что groupby по сырым токенам не нужен.
+    collocation_counter: Counter[tuple] = Counter()
 
-    collocation_records: List[Dict[str, object]] = []
     adjective_map: Dict[str, List[tuple[str, int]]] = {}
     verb_map: Dict[str, List[tuple[str, int]]] = {}
     toponym_map: Dict[str, List[str]] = {}
 
-    iterable = tqdm(
-        contexts.to_dict(orient="records"),
-        desc="Running spaCy analysis",
-        total=len(contexts),
-    )
-
-    for row in iterable:
-        context_id = row.get("context_id") or hash_text(row.get("context", ""))
-        doc = nlp(row.get("context", ""))
+    records = contexts.to_dict(orient="records")
+
+    # Повторяющиеся пассажи прогоняются через spaCy один раз: пайплайн
+    # работает только по уникальным текстам, результаты раздаются по хэшу.
+    text_keys = [hash_text(row.get("context", "") or "") for row in records]
+    unique_texts: Dict[str, str] = {}
+    records_by_key: Dict[str, List[Dict[str, object]]] = defaultdict(list)
+    for key, row in zip(text_keys, records):
+        unique_texts.setdefault(key, row.get("context", "") or "")
+        records_by_key[key].append(row)
+    if len(unique_texts) < len(records):
+        LOGGER.info(
+            "Analyzing %d unique contexts (%d duplicates skipped).",
+            len(unique_texts),
+            len(records) - len(unique_texts),
+        )
 
+    pipe = nlp.pipe(
+        ((text, key) for key, text in unique_texts.items()),
+        as_tuples=True,
+        batch_size=batch_size,
+        n_process=n_process,
+    )
+    iterable = tqdm(pipe, desc="Running spaCy analysis", total=len(unique_texts))
+
+    # Производитель/потребитель: главный поток крутит nlp.pipe, а раздача
+    # результатов по записям идёт в фоновом потоке — агрегация прячется
+    # за узким местом spaCy. Потребитель один, поэтому словари и Counter
+    # не требуют блокировок.
+    result_queue: queue.Queue = queue.Queue(maxsize=256)
+
+    def _consume() -> None:
+        while True:
+            item = result_queue.get()
+            if item is None:
+                return
+            key, adjectives, verbs, toponyms, lemma_counts = item
+            for row in records_by_key[key]:
+                raw_id = row.get("context_id")
+                context_id = raw_id if isinstance(raw_id, str) else key
+                ethnonym = str(
+                    row.get("ethnonym_normalised") or row.get("ethnonym", "")
+                ).lower()
+                author = row.get("author", "")
+                year = row.get("year")
+
+                for (lemma, pos_label), count in lemma_counts.items():
+                    collocation_counter[
+                        (context_id, lemma, pos_label, ethnonym, author, year)
+                    ] += count
+
+                adjective_map[context_id] = adjectives
+                verb_map[context_id] = verbs
+                toponym_map[context_id] = toponyms
+
+    consumer = threading.Thread(target=_consume, daemon=True)
+    consumer.start()
+
+    for doc, key in iterable:
         adj_counter: Counter[str] = Counter()
         verb_counter: Counter[str] = Counter()
-        gpe_entities: List[str] = []
-
-        ethnonym = str(row.get("ethnonym_normalised") or row.get("ethnonym", "")).lower()
-
-        for token in doc:
-            if not token.is_alpha:
-                continue
-            lemma = token.lemma_.lower()
-            if not lemma or lemma in stopwords:
-                continue
-            if token.pos_ == "ADJ":
-                adj_counter[lemma] += 1
-                collocation_records.append(
-                    {
-                        "context_id": context_id,
-                        "lemma": lemma,
-                        "pos": "ADJ",
-                        "ethnonym": ethnonym,
-                        "author": row.get("author", ""),
-                        "year": row.get("year"),
-                        "count": 1,
-                    }
-                )
-            elif token.pos_ == "VERB":
-                verb_counter[lemma] += 1
-                collocation_records.append(
-                    {
-                        "context_id": context_id,
-                        "lemma": lemma,
-                        "pos": "VERB",
-                        "ethnonym": ethnonym,
-                        "author": row.get("author", ""),
-                        "year": row.get("year"),
-                        "count": 1,
-                    }
-                )
-
-        for ent in doc.ents:
-            if ent.label_ == "GPE":
-                gpe_entities.append(ent.text)
-
-        adjective_map[context_id] = adj_counter.most_common()
-        verb_map[context_id] = verb_counter.most_common()
-        toponym_map[context_id] = sorted(set(gpe_entities))
+        lemma_counts: Counter[tuple[str, str]] = Counter()
+
+        # Doc.to_array отдаёт атрибуты всего документа одним numpy-массивом:
+        # одна граница Cython/Python на документ вместо трёх на токен, а
+        # строка леммы декодируется один раз на уникальный хэш.
+        attrs = doc.to_array([POS, LEMMA, IS_ALPHA])
+        attrs = attrs[attrs[:, 2] == 1]
+        strings = doc.vocab.strings
+        for pos_id, pos_label, counter in (
+            (ADJ, "ADJ", adj_counter),
+            (VERB, "VERB", verb_counter),
+        ):
+            hash_counts = Counter(attrs[attrs[:, 0] == pos_id, 1].tolist())
+            for lemma_hash, count in hash_counts.items():
+                lemma = strings[lemma_hash].lower()
+                if not lemma or lemma in stopwords:
+                    continue
+                counter[lemma] += count
+                lemma_counts[(lemma, pos_label)] += count
+
+        # dict.fromkeys дедуплицирует, сохраняя порядок первого появления;
+        # для типичных коротких списков GPE это дешевле set + sort.
+        toponyms = list(
+            dict.fromkeys(ent.text for ent in doc.ents if ent.label_ == "GPE")
+        )
+
+        result_queue.put(
+            (
+                key,
+                adj_counter.most_common(),
+                verb_counter.most_common(),
+                toponyms,
+                lemma_counts,
+            )
+        )
+
+    result_queue.put(None)
+    consumer.join()
 
     collocations_output = Path(collocations_output)
     collocations_output.parent.mkdir(parents=True, exist_ok=True)
 
-    if collocation_records:
-        collocations_df = (
-            pd.DataFrame(collocation_records)
-            .groupby(["context_id", "lemma", "pos", "ethnonym", "author", "year"])
-            .agg({"count": "sum"})
-            .reset_index()
-            .sort_values(["year", "author", "ethnonym", "pos", "count"], ascending=[True, True, True, True, False])
+    if collocation_counter:
+        collocations_df = pd.DataFrame(
+            [(*key, count) for key, count in collocation_counter.items()],
+            columns=["context_id", "lemma", "pos", "ethnonym", "author", "year", "count"],
+        ).sort_values(
+            ["year", "author", "ethnonym", "pos", "count"],
+            ascending=[True, True, True, True, False],
         )
-        collocations_df.to_csv(collocations_output, index=False)
+        # Повторяющиеся строковые колонки пишутся словарно закодированными
+        # (dictionary encoding) — файл меньше, повторное чтение быстрее.
+        table = pa.Table.from_pandas(collocations_df, preserve_index=False)
+        for column in ("lemma", "pos", "ethnonym", "author"):
+            index = table.schema.get_field_index(column)
+            table = table.set_column(
+                index, column, table.column(column).dictionary_encode()
+            )
+        pq.write_table(table, collocations_output, compression="zstd")
+        if legacy_csv:
+            collocations_df.to_csv(collocations_output.with_suffix(".csv"), index=False)
         LOGGER.info(
             "Saved collocation statistics to %s (%d rows)",
             collocations_output,
             len(collocations_df),
         )
     else:
-        LOGGER.info("No collocations identified; skipping CSV export.")
-
-    contexts.loc[:, "context_id"] = contexts.apply(_normalise_context_id, axis=1)
-    contexts.loc[:, "adjectives"] = contexts["context_id"].map(
-        lambda cid: adjective_map.get(cid, [])
-    )
-    contexts.loc[:, "verbs"] = contexts["context_id"].map(
-        lambda cid: verb_map.get(cid, [])
-    )
-    contexts.loc[:, "toponyms"] = contexts["context_id"].map(
-        lambda cid: toponym_map.get(cid, [])
+        LOGGER.info("No collocations identified; skipping export.")
+
+    # Нормализация идентификаторов без apply(axis=1): хэш считается только
+    # для строк без валидного context_id.
+    hashed = contexts["context"].fillna("").map(hash_text)
+    if "context_id" in contexts.columns:
+        has_id = contexts["context_id"].map(lambda v: isinstance(v, str))
+        contexts.loc[:, "context_id"] = contexts["context_id"].where(has_id, hashed)
+    else:
+        contexts.loc[:, "context_id"] = hashed
+
+    # Результаты анализа присоединяются одним hash-join по context_id
+    # вместо трёх Python-проходов .map по всей колонке.
+    features = pd.DataFrame(
+        {
+            "context_id": list(adjective_map.keys()),
+            "adjectives": list(adjective_map.values()),
+            "verbs": [verb_map[key] for key in adjective_map],
+            "toponyms": [toponym_map[key] for key in adjective_map],
+        }
     )
+    contexts = contexts.merge(features, on="context_id", how="left")
 
     return contexts
 
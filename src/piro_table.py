@@ -7,7 +7,7 @@ from __future__ import annotations
 
 import logging
 from pathlib import Path
-from typing import Any, Dict, Iterable, List
+from typing import Any
 
 import pandas as pd
 
@@ -42,32 +42,53 @@ def make_piro_table(
         LOGGER.warning("Empty contexts dataframe; PIRO table will not be created.")
         return contexts
 
-    records: List[Dict[str, Any]] = []
-    for row in contexts.to_dict(orient="records"):
-        records.append(
-            {
-                "context_id": row.get("context_id"),
-                "author": row.get("author"),
-                "year": row.get("year"),
-                "title": row.get("title"),
-                "source": row.get("source"),
-                "ethnonym": row.get("ethnonym"),
-                "Place": _stringify_list(row.get("toponyms", [])),
-                "Identity": row.get("ethnonym_normalised") or row.get("ethnonym"),
-                "Representation": row.get("semantic_label", ""),
-                "Representation_ru": row.get("semantic_label_ru", ""),
-                "Otherness": row.get("attitude", ""),
-                "Otherness_ru": row.get("attitude_ru", ""),
-                "Summary_en": row.get("summary_en", ""),
-                "Summary_ru": row.get("summary_ru", ""),
-                "Context": row.get("context", ""),
-            }
-        )
-
-    table = pd.DataFrame.from_records(records)
+    def _column(name: str, default: str = "") -> pd.Series:
+        if name in contexts.columns:
+            return contexts[name]
+        return pd.Series(default, index=contexts.index)
+
+    normalised = _column("ethnonym_normalised").fillna("")
+
+    # Таблица собирается колонками (операции pandas выполняются в C);
+    # Python-цикл остаётся только у .map для списков топонимов.
+    table = pd.DataFrame(
+        {
+            "context_id": _column("context_id"),
+            "author": _column("author"),
+            "year": _column("year"),
+            "title": _column("title"),
+            "source": _column("source"),
+            "ethnonym": _column("ethnonym"),
+            "Place": _column("toponyms").map(_stringify_list),
+            "Identity": normalised.where(normalised.astype(bool), _column("ethnonym")),
+            "Representation": _column("semantic_label"),
+            "Representation_ru": _column("semantic_label_ru"),
+            "Otherness": _column("attitude"),
+            "Otherness_ru": _column("attitude_ru"),
+            "Summary_en": _column("summary_en"),
+            "Summary_ru": _column("summary_ru"),
+            "Context": _column("context"),
+        }
+    )
     output_path = Path(output_path)
     output_path.parent.mkdir(parents=True, exist_ok=True)
-    table.to_excel(output_path, index=False)
+
+    # Канонический артефакт — Parquet; downstream-инструменты читают его
+    # на порядок быстрее xlsx.
+    table.to_parquet(
+        output_path.with_suffix(".parquet"),
+        engine="pyarrow",
+        compression="zstd",
+        index=False,
+    )
+    # xlsx остаётся как удобный экспорт; constant_memory пишет строки
+    # потоково, не держа всю книгу объектами в памяти.
+    with pd.ExcelWriter(
+        output_path,
+        engine="xlsxwriter",
+        engine_kwargs={"options": {"constant_memory": True}},
+    ) as writer:
+        table.to_excel(writer, index=False)
 
     LOGGER.info("PIRO table saved to %s (%d rows)", output_path, len(table))
     return table
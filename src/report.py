@@ -6,9 +6,13 @@ from __future__ import annotations
 
 import datetime as dt
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from typing import Optional
 
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
 
 from src.deepseek_module import interpret_cached
 
@@ -16,8 +20,57 @@ from src.deepseek_module import interpret_cached
 LOGGER = logging.getLogger(__name__)
 REPORT_PATH = Path("output") / "report.html"
 
+SUMMARY_COLUMNS = [
+    "author",
+    "year",
+    "title",
+    "ethnonym",
+    "semantic_label",
+    "semantic_label_ru",
+    "attitude",
+    "attitude_ru",
+    "summary_en",
+    "summary_ru",
+]
+SAMPLE_COLUMNS = [
+    "author",
+    "year",
+    "ethnonym",
+    "context",
+    "semantic_label",
+    "attitude",
+]
+
 pd.set_option("display.max_colwidth", 100)
 
+# Статический каркас отчёта собирается один раз на модуль; на каждый вызов
+# остаётся только подстановка значений.
+_REPORT_PROLOGUE = """<!DOCTYPE html>
+<html lang="ru">
+<head>
+    <meta charset="utf-8">
+    <title>Анализ образа калмыков (Kalmyk Image DH Analysis)</title>
+    <link rel="stylesheet" href="https://cdnjs.cloudflare.com/ajax/libs/mini.css/3.0.1/mini-default.min.css">
+    <style>
+        body {{ margin: 2rem; }}
+        h1, h2, h3 {{ margin-top: 2rem; }}
+        img.figure {{ max-width: 100%; height: auto; margin-bottom: 1.5rem; }}
+        .table-sm td, .table-sm th {{ padding: 0.35rem; }}
+    </style>
+</head>
+<body>
+    <h1>Анализ образа калмыков (Kalmyk Image DH Analysis)</h1>
+    <p>Отчёт сгенерирован {timestamp}</p>
+
+    <h2>Обзор проекта (Project Overview)</h2>
+    <p>Документ фиксирует автоматизированный анализ англоязычных травелогов о Сибири и Алтае (1864–1919), посвящённых образу калмыков.</p>
+    <ul>
+        <li>Количество проанализированных контекстов: <strong>{total_contexts}</strong></li>
+        <li>Число уникальных авторов: <strong>{unique_authors}</strong></li>
+        <li>Хронологическое покрытие: <strong>{time_start} – {time_end}</strong></li>
+    </ul>
+"""
+
 
 def add_summary_block(df: pd.DataFrame) -> str:
     sem = df["semantic_label"].value_counts().to_dict()
@@ -34,29 +87,50 @@ def add_summary_block(df: pd.DataFrame) -> str:
     return html_block
 
 
-def shorten_text(text: str, limit: int = 200) -> str:
-    if isinstance(text, str) and len(text) > limit:
-        return text[:limit] + "..."
-    return text
+TEXT_LIMIT = 200
 
 
-def render_table(df: pd.DataFrame, title: str) -> str:
-    if df.empty:
-        table_html = "<p>No data available.</p>"
-    else:
-        table_html = df.to_html(
-            classes="table table-striped table-sm",
-            index=False,
-            escape=False,
-            justify="left",
-            col_space=120,
-        )
-    return f"""
+def _clean_summary_column(values: pa.ChunkedArray, limit: int = TEXT_LIMIT) -> pa.ChunkedArray:
+    """Collapse newlines to <br> and truncate long cells, all in Arrow compute."""
+    values = pc.fill_null(values.cast(pa.string()), "")
+    values = pc.replace_substring_regex(values, r"\n+", "<br>")
+    return pc.if_else(
+        pc.less_equal(pc.utf8_length(values), limit),
+        values,
+        pc.binary_join_element_wise(
+            pc.utf8_slice_codeunits(values, 0, limit), "...", ""
+        ),
+    )
+
+
+def write_table(handle, table: Optional[pa.Table], title: str) -> None:
+    """
+    Stream an HTML table for an Arrow table directly to the report handle.
+
+    Rows are written batch by batch instead of materialising the whole
+    `to_html` string, so peak memory stays flat for large summary frames.
+    """
+    handle.write(f"""
     <h3>{title}</h3>
     <div style="max-height:500px; overflow:auto; border:1px solid #ccc; padding:0.5rem; margin-bottom:1rem;">
-        {table_html}
-    </div>
-    """
+    """)
+    if table is None or table.num_rows == 0:
+        handle.write("<p>No data available.</p>")
+    else:
+        handle.write('<table class="table table-striped table-sm">\n<thead>\n<tr>')
+        for column in table.column_names:
+            handle.write(
+                f'<th style="min-width:120px; text-align:left;">{column}</th>'
+            )
+        handle.write("</tr>\n</thead>\n<tbody>\n")
+        for batch in table.to_batches(max_chunksize=4096):
+            for row in zip(*[column.to_pylist() for column in batch.columns]):
+                handle.write("<tr>")
+                for cell in row:
+                    handle.write(f"<td>{cell}</td>")
+                handle.write("</tr>\n")
+        handle.write("</tbody>\n</table>")
+    handle.write("\n    </div>\n    ")
 
 
 def interpret_visual_or_table(title: str, description_hint: str, sample_text: str = "") -> str:
@@ -71,173 +145,160 @@ def generate_report(contexts: pd.DataFrame, output_path: Path | str = REPORT_PAT
     Produce an HTML dashboard linking together the analysis artefacts.
     """
     output_path = Path(output_path)
-    output_path.parent.mkdir(parents=True, exist_ok=True)
+    if not output_path.parent.exists():
+        output_path.parent.mkdir(parents=True, exist_ok=True)
 
     total_contexts = len(contexts)
     unique_authors = contexts["author"].nunique(dropna=True)
+    year_min = contexts["year"].min()
+    year_max = contexts["year"].max()
     time_span = (
-        int(contexts["year"].min()) if pd.notnull(contexts["year"].min()) else None,
-        int(contexts["year"].max()) if pd.notnull(contexts["year"].max()) else None,
-    )
-
-    summary_table = (
-        contexts[
-            [
-                "author",
-                "year",
-                "title",
-                "ethnonym",
-                "semantic_label",
-                "semantic_label_ru",
-                "attitude",
-                "attitude_ru",
-                "summary_en",
-                "summary_ru",
-            ]
-        ].copy()
-        if not contexts.empty
-        else pd.DataFrame()
+        int(year_min) if pd.notnull(year_min) else None,
+        int(year_max) if pd.notnull(year_max) else None,
     )
 
-    for col in ["semantic_label_ru", "attitude_ru", "summary_ru"]:
-        if col in summary_table.columns:
-            summary_table[col] = (
-                summary_table[col]
-                .fillna("")
-                .astype(str)
-                .str.replace(r"\n+", "<br>", regex=True)
-                .apply(shorten_text)
+    # Проекции колонок делаются на pyarrow-таблице: select() не копирует
+    # данные, в отличие от contexts[[...]].copy().
+    if contexts.empty:
+        summary_arrow: Optional[pa.Table] = None
+        sample_arrow: Optional[pa.Table] = None
+    else:
+        report_columns = list(dict.fromkeys(SUMMARY_COLUMNS + SAMPLE_COLUMNS))
+        arrow_tbl = pa.Table.from_pandas(
+            contexts[report_columns], preserve_index=False
+        )
+        summary_arrow = arrow_tbl.select(SUMMARY_COLUMNS)
+        for col in ["semantic_label_ru", "attitude_ru", "summary_ru"]:
+            index = summary_arrow.schema.get_field_index(col)
+            summary_arrow = summary_arrow.set_column(
+                index, col, _clean_summary_column(summary_arrow.column(col))
             )
+        sample_arrow = arrow_tbl.select(SAMPLE_COLUMNS)
 
-    contexts_table = (
-        contexts[
-            [
-                "author",
-                "year",
-                "ethnonym",
-                "context",
-                "semantic_label",
-                "attitude",
-            ]
-        ].copy()
-        if not contexts.empty
-        else pd.DataFrame()
+    timestamp = dt.datetime.now(dt.timezone.utc).strftime("%Y-%m-%d %H:%M UTC")
+
+    preamble = _REPORT_PROLOGUE.format(
+        timestamp=timestamp,
+        total_contexts=total_contexts,
+        unique_authors=unique_authors,
+        time_start=time_span[0] or "N/A",
+        time_end=time_span[1] or "N/A",
     )
 
-    df_display = summary_table
+    # Все интерпретации запускаются разом в пуле потоков: запросы к API
+    # сетевые, поэтому суммарное время равно максимальной задержке, а не сумме.
+    interpret_jobs = [
+        (
+            "Сводная таблица аннотаций (DeepSeek Semantic Overview)",
+            "Содержит семантические метки, оценки тональности и двуязычные резюме для каждого контекста.",
+            summary_arrow.slice(0, 10).to_pandas().to_string() if summary_arrow is not None else "",
+        ),
+        (
+            "Примеры контекстов (Sample Contexts)",
+            "Показывает характерные выдержки, где упоминаются калмыки, вместе с назначенными категориями и тональностью.",
+            sample_arrow.slice(0, 10).to_pandas().to_string() if sample_arrow is not None else "",
+        ),
+        (
+            "Частота упоминаний по годам (Mentions by Year)",
+            "Отражает, в какие годы корпус фиксирует наибольшее количество ссылок на калмыков.",
+            "",
+        ),
+        (
+            "Облако слов (Word Cloud)",
+            "Визуализирует наиболее частотные лексемы в контекстах о калмыках, выделяя доминирующие темы и эпитеты.",
+            "",
+        ),
+        (
+            "Сеть автор – этноним – топоним (Author–Ethnonym–Place Network)",
+            "Демонстрирует, какие авторы связывают калмыков с определёнными топонимами, показывая географическое воображение.",
+            "",
+        ),
+        (
+            "Распределение типов образов (Distribution of Kalmyk Image Types)",
+            "Показывает, какие смысловые категории (этнографическая, функциональная, оценочная и др.) доминируют в корпусе.",
+            "",
+        ),
+        (
+            "Тональность по авторам (Sentiment by Author)",
+            "Отражает пропорции позитивных, нейтральных и негативных описаний у каждого автора.",
+            "",
+        ),
+        (
+            "Статистическое резюме (Statistical Summary)",
+            "Кратко объясняет, какие образы и тональности преобладают и как это соотносится с британской ориенталистской традицией.",
+            contexts.head(10).to_string(),
+        ),
+    ]
+    with ThreadPoolExecutor(max_workers=len(interpret_jobs)) as executor:
+        explanations = list(
+            executor.map(lambda job: interpret_visual_or_table(*job), interpret_jobs)
+        )
 
-    timestamp = dt.datetime.utcnow().strftime("%Y-%m-%d %H:%M UTC")
+    # Отчёт пишется потоково: таблицы уходят в файл построчно, без
+    # промежуточной HTML-строки на весь документ.
+    with output_path.open("w", encoding="utf-8", buffering=1 << 20) as handle:
+        handle.write(preamble)
 
-    html = f"""<!DOCTYPE html>
-<html lang="ru">
-<head>
-    <meta charset="utf-8">
-    <title>Анализ образа калмыков (Kalmyk Image DH Analysis)</title>
-    <link rel="stylesheet" href="https://cdnjs.cloudflare.com/ajax/libs/mini.css/3.0.1/mini-default.min.css">
-    <style>
-        body {{ margin: 2rem; }}
-        h1, h2, h3 {{ margin-top: 2rem; }}
-        img.figure {{ max-width: 100%; height: auto; margin-bottom: 1.5rem; }}
-        .table-sm td, .table-sm th {{ padding: 0.35rem; }}
-    </style>
-</head>
-<body>
-    <h1>Анализ образа калмыков (Kalmyk Image DH Analysis)</h1>
-    <p>Отчёт сгенерирован {timestamp}</p>
+        write_table(handle, summary_arrow, "Сводная таблица аннотаций (DeepSeek Semantic Overview)")
+        handle.write(explanations[0])
 
-    <h2>Обзор проекта (Project Overview)</h2>
-    <p>Документ фиксирует автоматизированный анализ англоязычных травелогов о Сибири и Алтае (1864–1919), посвящённых образу калмыков.</p>
-    <ul>
-        <li>Количество проанализированных контекстов: <strong>{total_contexts}</strong></li>
-        <li>Число уникальных авторов: <strong>{unique_authors}</strong></li>
-        <li>Хронологическое покрытие: <strong>{time_span[0] or 'N/A'} – {time_span[1] or 'N/A'}</strong></li>
-    </ul>
-"""
-
-    html += render_table(df_display, "Сводная таблица аннотаций (DeepSeek Semantic Overview)")
-    html += interpret_visual_or_table(
-        "Сводная таблица аннотаций (DeepSeek Semantic Overview)",
-        "Содержит семантические метки, оценки тональности и двуязычные резюме для каждого контекста.",
-        df_display.head(10).to_string(),
-    )
-
-    html += render_table(contexts_table.head(50), "Примеры контекстов (Sample Contexts)")
-    html += interpret_visual_or_table(
-        "Примеры контекстов (Sample Contexts)",
-        "Показывает характерные выдержки, где упоминаются калмыки, вместе с назначенными категориями и тональностью.",
-        contexts_table.head(10).to_string(),
-    )
+        write_table(
+            handle,
+            sample_arrow.slice(0, 50) if sample_arrow is not None else None,
+            "Примеры контекстов (Sample Contexts)",
+        )
+        handle.write(explanations[1])
 
-    html += """
+        handle.write("""
     <h2>Визуализации (Visualisations)</h2>
     <h3>Частота упоминаний по годам (Mentions by Year)</h3>
     <div>
         <img class="figure" src="figures/mentions_by_year.png" alt="Mentions by year">
     </div>
-"""
-    html += interpret_visual_or_table(
-        "Частота упоминаний по годам (Mentions by Year)",
-        "Отражает, в какие годы корпус фиксирует наибольшее количество ссылок на калмыков.",
-    )
+""")
+        handle.write(explanations[2])
 
-    html += """
+        handle.write("""
     <h3>Облако слов (Word Cloud)</h3>
     <div>
         <img class="figure" src="figures/wordcloud.png" alt="Word cloud">
     </div>
-"""
-    html += interpret_visual_or_table(
-        "Облако слов (Word Cloud)",
-        "Визуализирует наиболее частотные лексемы в контекстах о калмыках, выделяя доминирующие темы и эпитеты.",
-    )
+""")
+        handle.write(explanations[3])
 
-    html += """
+        handle.write("""
     <h3>Сеть автор – этноним – топоним (Author–Ethnonym–Place Network)</h3>
     <div>
         <img class="figure" src="figures/network.png" alt="Author–Ethnonym–Place network">
     </div>
-"""
-    html += interpret_visual_or_table(
-        "Сеть автор – этноним – топоним (Author–Ethnonym–Place Network)",
-        "Демонстрирует, какие авторы связывают калмыков с определёнными топонимами, показывая географическое воображение.",
-    )
+""")
+        handle.write(explanations[4])
 
-    html += """
+        handle.write("""
     <h3>Распределение типов образов (Distribution of Kalmyk Image Types)</h3>
     <div>
         <img class="figure" src="figures/semantic_distribution.png" alt="Semantic distribution">
     </div>
-"""
-    html += interpret_visual_or_table(
-        "Распределение типов образов (Distribution of Kalmyk Image Types)",
-        "Показывает, какие смысловые категории (этнографическая, функциональная, оценочная и др.) доминируют в корпусе.",
-    )
+""")
+        handle.write(explanations[5])
 
-    html += """
+        handle.write("""
     <h3>Тональность по авторам (Sentiment by Author)</h3>
     <div>
         <img class="figure" src="figures/sentiment_by_author.png" alt="Sentiment by author">
     </div>
-"""
-    html += interpret_visual_or_table(
-        "Тональность по авторам (Sentiment by Author)",
-        "Отражает пропорции позитивных, нейтральных и негативных описаний у каждого автора.",
-    )
+""")
+        handle.write(explanations[6])
 
-    html += add_summary_block(contexts)
-    html += interpret_visual_or_table(
-        "Статистическое резюме (Statistical Summary)",
-        "Кратко объясняет, какие образы и тональности преобладают и как это соотносится с британской ориенталистской традицией.",
-        contexts.head(10).to_string(),
-    )
+        handle.write(add_summary_block(contexts))
+        handle.write(explanations[7])
 
-    html += """
+        handle.write("""
     <p>Все артефакты воспроизводимы и описаны в сценарии <code>main.py</code>.</p>
 </body>
 </html>
-"""
+""")
 
-    output_path.write_text(html, encoding="utf-8")
     LOGGER.info("Report written to %s", output_path)
 
 
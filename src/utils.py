@@ -8,10 +8,12 @@ that are shared across the processing pipeline.
 
 from __future__ import annotations
 
+import csv
 import hashlib
 import logging
 import os
 import re
+from concurrent.futures import ThreadPoolExecutor
 from io import StringIO
 from pathlib import Path
 from typing import Iterable, List, Optional, Sequence
@@ -24,7 +26,12 @@ from nltk.data import find as nltk_find
 
 LOGGER = logging.getLogger(__name__)
 DEFAULT_METADATA_PATH = Path("data") / "metadata.csv"
+DEFAULT_TEXTS_CACHE_DIR = Path("output") / "cache"
 WHITESPACE_RE = re.compile(r"\s+")
+# Срабатывает на любой пробельный символ, кроме одиночного ASCII-пробела
+# (включая \f, \v, \xa0 и прочие юникодные пробелы), и на двойной пробел:
+# если совпадений нет, WHITESPACE_RE.sub ничего бы не изменил.
+_DIRTY_WHITESPACE_RE = re.compile(r"[^\S ]|  ")
 
 
 def ensure_nltk_resources() -> None:
@@ -50,10 +57,24 @@ def clean_text(text: str) -> str:
     """
     if not isinstance(text, str):
         return ""
+    # Быстрая ветка: у уже нормализованного текста (частый случай после
+    # первого прохода) замена была бы тождественной — один C-скан без
+    # аллокации новой строки вместо sub.
+    if _DIRTY_WHITESPACE_RE.search(text) is None:
+        return text.strip()
     text = WHITESPACE_RE.sub(" ", text)
     return text.strip()
 
 
+# Таблица для str.translate: выбрасывает всё, кроме буквенно-цифровых
+# символов и подчёркивания (аналог \W+ без затрат на регулярное выражение).
+_IDENTIFIER_STRIP_TABLE = {
+    code: None
+    for code in range(0x10000)
+    if not (chr(code).isalnum() or chr(code) == "_")
+}
+
+
 def _normalise_identifier(value: Optional[str]) -> str:
     """
     Collapse a string into a comparable identifier by removing punctuation and
@@ -61,7 +82,7 @@ def _normalise_identifier(value: Optional[str]) -> str:
     """
     if not value:
         return ""
-    return re.sub(r"\W+", "", value).lower()
+    return value.translate(_IDENTIFIER_STRIP_TABLE).lower()
 
 
 FALLBACK_ENCODINGS = ["utf-8", "utf-8-sig", "cp1251", "windows-1252", "latin-1"]
@@ -70,24 +91,33 @@ FALLBACK_ENCODINGS = ["utf-8", "utf-8-sig", "cp1251", "windows-1252", "latin-1"]
 def _read_metadata_csv(metadata_path: Path) -> pd.DataFrame:
     raw_bytes = metadata_path.read_bytes()
     last_error: Optional[Exception] = None
+    text: Optional[str] = None
     for encoding in FALLBACK_ENCODINGS:
         try:
             text = raw_bytes.decode(encoding)
-            try:
-                return pd.read_csv(StringIO(text), sep=None, engine="python")
-            except Exception as exc:
-                last_error = exc
-                continue
+            break
         except UnicodeDecodeError as exc:
             last_error = exc
-            continue
-    raise UnicodeDecodeError(
-        "metadata",
-        getattr(last_error, "encoding", "utf-8"),
-        getattr(last_error, "start", 0),
-        getattr(last_error, "end", 0),
-        f"Unable to decode metadata.csv using encodings: {', '.join(FALLBACK_ENCODINGS)}",
-    )
+    if text is None:
+        raise UnicodeDecodeError(
+            "metadata",
+            getattr(last_error, "encoding", "utf-8"),
+            getattr(last_error, "start", 0),
+            getattr(last_error, "end", 0),
+            f"Unable to decode metadata.csv using encodings: {', '.join(FALLBACK_ENCODINGS)}",
+        )
+
+    # Разделитель определяется по строке заголовка, а парсинг идёт через
+    # pyarrow (с запасным C-движком) вместо медленного python-движка
+    # со сниффингом по всему файлу.
+    try:
+        sep = csv.Sniffer().sniff(text.split("\n", 1)[0]).delimiter
+    except csv.Error:
+        sep = ","
+    try:
+        return pd.read_csv(StringIO(text), sep=sep, engine="pyarrow")
+    except (ValueError, ImportError):
+        return pd.read_csv(StringIO(text), sep=sep, engine="c")
 
 
 def load_metadata(metadata_path: Optional[Path] = None) -> pd.DataFrame:
@@ -121,32 +151,66 @@ def load_metadata(metadata_path: Optional[Path] = None) -> pd.DataFrame:
 
     if "document_id" not in metadata.columns:
         if "filename" in metadata.columns:
-            metadata["document_id"] = metadata["filename"].map(
-                lambda value: Path(str(value)).stem
+            # Стем имени файла извлекается векторно (каталог и расширение
+            # срезаются регулярными выражениями) вместо Path-объекта на строку.
+            metadata["document_id"] = (
+                metadata["filename"].astype(str)
+                .str.replace(r"^.*[\\/]", "", regex=True)
+                .str.replace(r"\.[^.]+$", "", regex=True)
             )
         else:
             # As a fallback, construct a slug from author, year, title.
-            metadata["document_id"] = metadata.apply(
-                lambda row: "_".join(
-                    filter(
-                        None,
-                        [
-                            str(row.get("author", "")).strip().replace(" ", ""),
-                            str(int(row["year"])) if pd.notnull(row["year"]) else "",
-                            str(row.get("title", "")).strip().replace(" ", ""),
-                        ],
-                    )
-                ),
-                axis=1,
+            # Собирается векторно: str.cat по колонкам вместо apply(axis=1).
+            author = (
+                metadata["author"].fillna("").astype(str).str.strip()
+                .str.replace(" ", "", regex=False)
+            )
+            year = (
+                metadata["year"].astype("Int64").astype("string")
+                .fillna("").astype(str)
+            )
+            title = (
+                metadata["title"].fillna("").astype(str).str.strip()
+                .str.replace(" ", "", regex=False)
+            )
+            metadata["document_id"] = (
+                author.str.cat([year, title], sep="_")
+                .str.replace(r"_{2,}", "_", regex=True)
+                .str.strip("_")
             )
 
-    metadata["__norm_id"] = metadata["document_id"].map(_normalise_identifier)
+    # Нормализация идентификаторов одним векторным вызовом; для одиночных
+    # строк остаётся _normalise_identifier с той же семантикой.
+    metadata["__norm_id"] = (
+        metadata["document_id"].fillna("").astype(str)
+        .str.replace(r"\W+", "", regex=True)
+        .str.lower()
+    )
     return metadata
 
 
+def _texts_cache_key(entries: Sequence[os.DirEntry], meta_path: Optional[Path]) -> str:
+    """
+    Fingerprint the corpus state (file names, mtimes, sizes and the metadata
+    file) so cached load_texts results are invalidated on any change.
+    """
+    digest = hashlib.sha256()
+    for entry in entries:
+        stat = entry.stat()
+        digest.update(entry.name.encode("utf-8"))
+        digest.update(str(stat.st_mtime_ns).encode("ascii"))
+        digest.update(str(stat.st_size).encode("ascii"))
+    if meta_path is not None and meta_path.exists():
+        stat = meta_path.stat()
+        digest.update(str(meta_path).encode("utf-8"))
+        digest.update(str(stat.st_mtime_ns).encode("ascii"))
+    return digest.hexdigest()
+
+
 def load_texts(
     text_directory: Path | str,
     metadata_path: Optional[Path | str] = None,
+    cache_dir: Optional[Path | str] = DEFAULT_TEXTS_CACHE_DIR,
 ) -> pd.DataFrame:
     """
     Load and clean all travelog texts from the given directory.
@@ -157,6 +221,9 @@ def load_texts(
         Directory containing plaintext files (UTF-8 encoded).
     metadata_path:
         Optional path to the metadata CSV. Defaults to `data/metadata.csv`.
+    cache_dir:
+        Directory for the memoized Parquet copy of the result, keyed by the
+        corpus content fingerprint. Pass None to disable caching.
 
     Returns
     -------
@@ -174,31 +241,89 @@ def load_texts(
     if not text_dir.exists():
         raise FileNotFoundError(f"Text directory not found: {text_dir}")
 
-    metadata: Optional[pd.DataFrame] = None
+    meta_path: Optional[Path] = None
     if metadata_path is not None or DEFAULT_METADATA_PATH.exists():
         meta_path = Path(metadata_path) if metadata_path else DEFAULT_METADATA_PATH
-        if meta_path.exists():
-            metadata = load_metadata(meta_path)
+
+    # os.scandir отдаёт имя и stat одним системным вызовом на файл — без
+    # Path-объектов и повторных stat при построении отпечатка кэша.
+    with os.scandir(text_dir) as it:
+        text_entries = sorted(
+            (entry for entry in it if entry.is_file() and entry.name.endswith(".txt")),
+            key=lambda entry: entry.name,
+        )
+
+    # Мемоизация: если состав корпуса и метаданные не менялись, результат
+    # читается из parquet-кэша без повторного чтения и очистки файлов.
+    cache_file: Optional[Path] = None
+    if cache_dir is not None and text_entries:
+        cache_key = _texts_cache_key(text_entries, meta_path)
+        cache_file = Path(cache_dir) / f"texts_{cache_key}.parquet"
+        if cache_file.exists():
+            LOGGER.info("Loading texts from cache: %s", cache_file)
+            return pd.read_parquet(cache_file, engine="pyarrow")
+
+    metadata: Optional[pd.DataFrame] = None
+    if meta_path is not None and meta_path.exists():
+        metadata = load_metadata(meta_path)
+
+    # Поисковые словари строятся один раз: каждый документ находит свою
+    # строку метаданных за O(1) вместо булевых сканов всей таблицы.
+    meta_by_id: dict[str, dict] = {}
+    meta_by_file: dict[str, dict] = {}
+    if metadata is not None:
+        # Нормализованные имена файлов материализуются один раз векторно,
+        # а не функцией на запись при построении словаря.
+        norm_filenames: Optional[List[str]] = None
+        if "filename" in metadata.columns:
+            norm_filenames = (
+                metadata["filename"].fillna("").astype(str)
+                .str.replace(r"\W+", "", regex=True)
+                .str.lower()
+                .tolist()
+            )
+        for position, record in enumerate(metadata.to_dict(orient="records")):
+            meta_by_id.setdefault(record["__norm_id"], record)
+            if norm_filenames is not None:
+                meta_by_file.setdefault(norm_filenames[position], record)
+
+    # Чтение файлов I/O-bound и отпускает GIL: пул потоков читает корпус
+    # почти линейно быстрее последовательного обхода. Файлы читаются как
+    # байты одним read() без буферизации, декодирование идёт отдельным
+    # батчем.
+    raw_texts: List[str] = []
+    if text_entries:
+        with ThreadPoolExecutor(max_workers=min(32, len(text_entries))) as executor:
+            raw_bytes = list(
+                executor.map(
+                    lambda entry: open(entry.path, "rb", buffering=0).read(),
+                    text_entries,
+                )
+            )
+        raw_texts = [data.decode("utf-8", errors="ignore") for data in raw_bytes]
+
+    # Очистка пробелов выполняется одним векторным вызовом по всему корпусу;
+    # clean_text остаётся удобной обёрткой для одиночных строк.
+    cleaned_texts: List[str] = []
+    if raw_texts:
+        cleaned_texts = (
+            pd.Series(raw_texts)
+            .str.replace(WHITESPACE_RE, " ", regex=True)
+            .str.strip()
+            .tolist()
+        )
 
     rows = []
-    for text_path in sorted(text_dir.glob("*.txt")):
-        raw_text = text_path.read_text(encoding="utf-8", errors="ignore")
-        cleaned = clean_text(raw_text)
-        document_id = text_path.stem
+    for entry, raw_text, cleaned in zip(text_entries, raw_texts, cleaned_texts):
+        document_id = entry.name[: -len(".txt")]
         norm_id = _normalise_identifier(document_id)
 
         meta_row = {"author": "", "year": None, "title": "", "source": ""}
         if metadata is not None:
-            match = metadata.loc[
-                metadata["__norm_id"] == norm_id
-            ]
-            if match.empty and "filename" in metadata.columns:
-                alt_norm = _normalise_identifier(text_path.name)
-                match = metadata.loc[
-                    metadata["filename"].map(_normalise_identifier) == alt_norm
-                ]
-            if not match.empty:
-                meta = match.iloc[0]
+            meta = meta_by_id.get(norm_id)
+            if meta is None and meta_by_file:
+                meta = meta_by_file.get(_normalise_identifier(entry.name))
+            if meta is not None:
                 meta_row = {
                     "author": meta.get("author", ""),
                     "year": int(meta["year"]) if pd.notnull(meta["year"]) else None,
@@ -208,7 +333,7 @@ def load_texts(
         rows.append(
             {
                 "document_id": document_id,
-                "filename": text_path.name,
+                "filename": entry.name,
                 "author": meta_row["author"],
                 "year": meta_row["year"],
                 "title": meta_row["title"],
@@ -237,6 +362,10 @@ def load_texts(
                 ", ".join(unmatched_docs[:10]) + ("..." if len(unmatched_docs) > 10 else ""),
             )
 
+    if cache_file is not None and not df.empty:
+        cache_file.parent.mkdir(parents=True, exist_ok=True)
+        df.to_parquet(cache_file, engine="pyarrow", compression="zstd", index=False)
+
     return df
 
 
@@ -253,12 +382,13 @@ def load_ethnonyms(path: Path | str) -> List[str]:
     path = Path(path)
     if not path.exists():
         raise FileNotFoundError(f"Ethnonym list not found: {path}")
-    ethnonyms = [
-        line.strip().lower()
-        for line in path.read_text(encoding="utf-8").splitlines()
-        if line.strip()
-    ]
-    return sorted(set(ethnonyms))
+    # Файл разбирается за один проход: множество строится сразу, без
+    # промежуточного списка; сортировка остаётся ради детерминизма.
+    raw = path.read_bytes().decode("utf-8")
+    ethnonyms = {
+        word for word in (line.strip().lower() for line in raw.splitlines()) if word
+    }
+    return sorted(ethnonyms)
 
 
 def load_stopwords(path: Path | str) -> set[str]:
@@ -269,12 +399,10 @@ def load_stopwords(path: Path | str) -> set[str]:
     if not path.exists():
         LOGGER.warning("Stopword file not found at %s", path)
         return set()
-    words = {
-        line.strip().lower()
-        for line in path.read_text(encoding="utf-8").splitlines()
-        if line.strip()
+    raw = path.read_bytes().decode("utf-8")
+    return {
+        word for word in (line.strip().lower() for line in raw.splitlines()) if word
     }
-    return words
 
 
 def hash_text(text: str) -> str:
@@ -5,38 +5,113 @@ Generate visual representations of the Kalmyk Image DH analysis outputs.
 from __future__ import annotations
 
 import logging
+from collections import Counter
 from pathlib import Path
 
-import matplotlib.pyplot as plt
+import matplotlib
+
+# Пайплайн пишет фигуры только в файлы: Agg пропускает инициализацию
+# GUI-бэкенда и работает в headless-окружениях (CI) без дисплея.
+matplotlib.use("Agg")
+
+import matplotlib.pyplot as plt  # noqa: E402
 import networkx as nx
+import numpy as np
 import pandas as pd
 import seaborn as sns
+from wordcloud import STOPWORDS as WORDCLOUD_STOPWORDS
 from wordcloud import WordCloud
 
+from src.utils import load_stopwords
+
+# ForceAtlas2 (Cython) считает раскладку на порядки быстрее чистого Python
+# spring_layout; зависимость опциональна, без неё остаётся networkx.
+try:
+    from fa2 import ForceAtlas2
+except ImportError:  # pragma: no cover
+    ForceAtlas2 = None
+
 
 LOGGER = logging.getLogger(__name__)
 FIGURES_DIR = Path("output") / "figures"
+STOPWORDS_PATH = Path("data") / "stopwords_en.txt"
+
+# Кэш раскладок по содержимому графа: перегенерация фигур в одном процессе
+# не пересчитывает layout заново.
+_LAYOUT_CACHE: dict[int, dict] = {}
+
+
+def _graph_layout(G: nx.Graph) -> dict:
+    key = hash(
+        (
+            frozenset(G.nodes()),
+            frozenset((u, v, data["weight"]) for u, v, data in G.edges(data=True)),
+        )
+    )
+    pos = _LAYOUT_CACHE.get(key)
+    if pos is not None:
+        return pos
+    if ForceAtlas2 is not None:
+        pos = ForceAtlas2(verbose=False).forceatlas2_networkx_layout(
+            G, pos=None, iterations=200
+        )
+    else:
+        pos = nx.spring_layout(G, seed=42, k=0.3)
+    _LAYOUT_CACHE[key] = pos
+    return pos
+
+
+def _token_frequencies(values: list[str], wordcloud: WordCloud) -> Counter[str]:
+    """Считает частоты токенов по списку текстов без склейки в одну строку.
+
+    Токенизация и фильтрация (стоп-слова, числа, минимальная длина слова)
+    делегируются WordCloud.process_text, так что итоговые частоты совпадают
+    с тем, что дал бы generate() по склеенному тексту.
+    """
+    counter: Counter[str] = Counter()
+    for value in values:
+        for token, count in wordcloud.process_text(value).items():
+            counter[token.lower()] += count
+    # process_text склеивает единственное/множественное число внутри одного
+    # документа; досведение между документами делается тем же правилом.
+    for word in [w for w in counter if w.endswith("s") and not w.endswith("ss")]:
+        singular = word[:-1]
+        if singular in counter:
+            counter[singular] += counter.pop(word)
+    return counter
 
 
 def _save_figure(fig: plt.Figure, path: Path) -> None:
     path.parent.mkdir(parents=True, exist_ok=True)
-    fig.savefig(path, bbox_inches="tight")
+    # dpi=100 и быстрый уровень zlib-сжатия: кодирование PNG на уровне 6
+    # в разы дороже уровня 1 при малом выигрыше в размере файла.
+    fig.savefig(
+        path,
+        bbox_inches="tight",
+        dpi=100,
+        metadata={"Software": ""},
+        pil_kwargs={"optimize": False, "compress_level": 1},
+    )
     plt.close(fig)
     LOGGER.info("Saved figure: %s", path)
 
 
 def plot_frequency(df: pd.DataFrame, output_path: Path) -> None:
-    year_counts = (
-        df.dropna(subset=["year"])
-        .groupby("year")
-        .size()
-        .reset_index(name="mentions")
-        .sort_values("year")
-    )
-    if year_counts.empty:
+    years = df["year"].dropna().astype(np.int64).to_numpy()
+    if years.size == 0:
         LOGGER.warning("No valid year data for frequency plot.")
         return
 
+    # Годы — плотные целые ключи, поэтому np.bincount (один C-проход по
+    # массиву) заменяет хэш-таблицу groupby; результат уже отсортирован.
+    base = years.min()
+    counts = np.bincount(years - base)
+    year_axis = np.arange(base, base + len(counts))
+    nonzero = counts > 0
+    year_counts = pd.DataFrame(
+        {"year": year_axis[nonzero], "mentions": counts[nonzero]}
+    )
+
     fig, ax = plt.subplots(figsize=(8, 4))
     sns.lineplot(data=year_counts, x="year", y="mentions", marker="o", ax=ax)
     ax.set_title("Kalmyk ethnonym mentions by year")
@@ -56,20 +131,28 @@ def wordcloud_ethnonym(df: pd.DataFrame, ethnonym: str, output_path: Path) -> No
         values = target_df["summary_en"].dropna().tolist()
     else:
         values = target_df["context"].dropna().tolist() if "context" in target_df.columns else []
-    text_source = " ".join(filter(None, values))
-    if not text_source and "context" in df.columns:
-        text_source = " ".join(filter(None, df["context"].dropna().tolist()))
-
-    if not text_source.strip():
-        LOGGER.warning("No text available to generate word cloud.")
-        return
-
+    # Частоты агрегируются заранее: generate_from_frequencies пропускает
+    # повторную токенизацию WordCloud и не требует склейки всего корпуса
+    # в одну гигантскую строку. Встроенный список стоп-слов WordCloud
+    # дополняется проектным из data/stopwords_en.txt.
     wordcloud = WordCloud(
         width=1200,
         height=800,
         background_color="white",
         collocations=False,
-    ).generate(text_source)
+        stopwords=set(WORDCLOUD_STOPWORDS) | load_stopwords(STOPWORDS_PATH),
+    )
+    frequencies = _token_frequencies([v for v in values if v], wordcloud)
+    if not frequencies and "context" in df.columns:
+        frequencies = _token_frequencies(
+            df["context"].dropna().tolist(), wordcloud
+        )
+
+    if not frequencies:
+        LOGGER.warning("No text available to generate word cloud.")
+        return
+
+    wordcloud.generate_from_frequencies(frequencies)
 
     fig, ax = plt.subplots(figsize=(10, 6))
     ax.imshow(wordcloud, interpolation="bilinear")
@@ -84,42 +167,60 @@ def network_graph(df: pd.DataFrame, output_path: Path, min_weight: int = 2) -> N
         return
 
     G = nx.Graph()
-    edge_weights: dict[tuple[str, str], int] = {}
-    authors: set[str] = set()
-    ethnonyms: set[str] = set()
-    places: set[str] = set()
-
-    for row in df.to_dict(orient="records"):
-        author = row.get("author") or "Unknown author"
-        ethnonym = row.get("ethnonym_normalised") or row.get("ethnonym")
-        if not ethnonym:
-            continue
-
-        authors.add(author)
-        ethnonyms.add(ethnonym)
-        edge_weights[(author, ethnonym)] = edge_weights.get((author, ethnonym), 0) + 1
-
-        for place in row.get("toponyms", []) or []:
-            places.add(place)
-            edge_weights[(ethnonym, place)] = edge_weights.get((ethnonym, place), 0) + 1
-
-    for author in authors:
-        G.add_node(author, type="author")
-    for ethnonym in ethnonyms:
-        G.add_node(ethnonym, type="ethnonym")
-    for place in places:
-        G.add_node(place, type="place")
-
-    for (source, target), weight in edge_weights.items():
-        if weight < min_weight:
-            continue
-        G.add_edge(source, target, weight=weight)
+
+    # Рёбра считаются векторно: groupby/size вместо Python-цикла по строкам
+    # со словарём весов.
+    ethnonym = (
+        df["ethnonym_normalised"].fillna("").astype(str)
+        if "ethnonym_normalised" in df.columns
+        else pd.Series("", index=df.index)
+    )
+    if "ethnonym" in df.columns:
+        ethnonym = ethnonym.where(ethnonym.ne(""), df["ethnonym"].fillna("").astype(str))
+    author = (
+        df["author"].fillna("").astype(str)
+        if "author" in df.columns
+        else pd.Series("", index=df.index)
+    )
+    author = author.where(author.ne(""), "Unknown author")
+
+    mask = ethnonym.ne("")
+    work = pd.DataFrame({"author": author, "ethnonym": ethnonym}).loc[mask]
+    author_edges = work.groupby(["author", "ethnonym"]).size()
+
+    place_edges = pd.Series(dtype="int64")
+    places: list[str] = []
+    if "toponyms" in df.columns:
+        exploded = (
+            pd.DataFrame({"ethnonym": ethnonym, "place": df["toponyms"]})
+            .loc[mask]
+            .explode("place")
+            .dropna(subset=["place"])
+        )
+        exploded = exploded[exploded["place"].astype(str).ne("")]
+        place_edges = exploded.groupby(["ethnonym", "place"]).size()
+        places = exploded["place"].unique().tolist()
+
+    G.add_nodes_from(work["author"].unique(), type="author")
+    G.add_nodes_from(work["ethnonym"].unique(), type="ethnonym")
+    G.add_nodes_from(places, type="place")
+
+    G.add_weighted_edges_from(
+        (source, target, int(weight))
+        for (source, target), weight in author_edges.items()
+        if weight >= min_weight
+    )
+    G.add_weighted_edges_from(
+        (source, target, int(weight))
+        for (source, target), weight in place_edges.items()
+        if weight >= min_weight
+    )
 
     if G.number_of_edges() == 0:
         LOGGER.warning("Network graph has no edges; skipping visualisation.")
         return
 
-    pos = nx.spring_layout(G, seed=42, k=0.3)
+    pos = _graph_layout(G)
     fig, ax = plt.subplots(figsize=(10, 8))
 
     node_colors = []
@@ -173,7 +274,9 @@ def plot_sentiment_by_author(df: pd.DataFrame, output_path: Path) -> None:
     if {"author", "attitude"}.difference(df.columns):
         LOGGER.warning("Required columns missing for sentiment plot.")
         return
-    crosstab = pd.crosstab(df["author"], df["attitude"])
+    # groupby + unstack агрегирует без промежуточной таблицы и вывода типов,
+    # которые делает pd.crosstab; результат поколоночно тот же.
+    crosstab = df.groupby(["author", "attitude"]).size().unstack(fill_value=0)
     if crosstab.empty:
         LOGGER.warning("No sentiment data to visualise by author.")
         return